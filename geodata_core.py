@@ -1,62 +1,206 @@
 # Diccionario Maestro de Comportamiento Geoquímico
 # Basado en Railsback (Earth Scientist's Periodic Table)
 
+import re
+
+import numpy as np
+import pandas as pd
+
 ELEMENTS = {
     "Si4+": {
-        "type": "Hard", "ip": 15.4, "role": "Network Former",
+        "type": "Hard", "role": "Network Former",
         "atomic_behavior": "Atrae oxígenos rígidamente (Tetraedros).",
         "mineral": "Cuarzo (SiO2)",
         "landscape": "Playas de arena blanca, picos de montañas resistentes (no se disuelve).",
         "color": "#E0E0E0", # Blanco/Gris claro
-        "radius": 0.26
     },
     "Ca2+": {
-        "type": "Hard", "ip": 2.0, "role": "Network Modifier",
+        "type": "Hard", "role": "Network Modifier",
         "atomic_behavior": "Enlace iónico medio. Soluble en ácido.",
         "mineral": "Calcita (CaCO3)",
         "landscape": "Paisajes Kársticos (Cuevas, Cenotes) por disolución.",
         "color": "#90CAF9", # Azul claro
-        "radius": 1.00
     },
     "Fe3+": {
-        "type": "Intermediate", "ip": 4.6, "role": "Pigment/Cement",
+        "type": "Intermediate", "role": "Pigment/Cement",
         "atomic_behavior": "Insoluble al oxidarse. Forma 'pegamento' de óxidos.",
         "mineral": "Hematita (Fe2O3)",
         "landscape": "Suelos rojos tropicales (Lateritas), desiertos rojos.",
         "color": "#D32F2F", # Rojo
-        "radius": 0.65
     },
     "Na+": {
-        "type": "Hard", "ip": 0.98, "role": "Solute",
+        "type": "Hard", "role": "Solute",
         "atomic_behavior": "Esfera hidratada muy laxa. No se pega a nada.",
         "mineral": "Halita (NaCl) - solo al secarse.",
         "landscape": "Océanos salados y Salares (se lava de las montañas y termina en el mar).",
         "color": "#4FC3F7", # Azul Cyan
-        "radius": 1.02
     },
     # Añadimos estos para la simulación del Oro
     "Au+": {
-        "type": "Soft", "ip": 0.73, "role": "Chalcophile",
+        "type": "Soft", "role": "Chalcophile",
         "atomic_behavior": "Nube electrónica difusa. Enlaces covalentes con S.",
         "mineral": "Oro Nativo / Sulfuros",
         "landscape": "Vetas profundas, no en agua.",
         "color": "#FFD700", # Oro
-        "radius": 1.37
     },
     "S2-": {
-        "type": "Soft", "ip": 0.5, "role": "Ligand", # IP approx para aniones grandes
+        "type": "Soft", "role": "Ligand",
         "atomic_behavior": "Gran nube polarizable.",
         "mineral": "Sulfuros",
         "landscape": "Ambientes reductores.",
         "color": "#FFEB3B", # Amarillo
-        "radius": 1.84
     },
     "O2-": {
-        "type": "Hard", "ip": 1.5, "role": "Ligand", # IP approx
+        "type": "Hard", "role": "Ligand",
         "atomic_behavior": "Pequeño y duro.",
         "mineral": "Óxidos / Silicatos",
         "landscape": "Ambientes oxidantes.",
         "color": "#FF5252", # Rojo claro
-        "radius": 1.40
     }
 }
+
+# Blandura HSAB (0 = Duro, 1 = Blando) por "type". El laboratorio la usa para escalar
+# la atracción covalente entre pares de especies (los intermedios atraen a medias).
+HSAB_SOFTNESS = {"Hard": 0.0, "Intermediate": 0.5, "Soft": 1.0}
+
+# --- Radios Iónicos Efectivos (Shannon, 1976) ---
+# Un radio por (ion, carga, coordinación, espín), en Angstroms.
+# Espín: "HS"/"LS" (alto/bajo) solo para metales de transición; "" si no aplica.
+SHANNON_RADII = [
+    # ion, carga, coordinación, espín, radio
+    ("K", 1, 4, "", 1.37), ("K", 1, 6, "", 1.38), ("K", 1, 8, "", 1.51), ("K", 1, 12, "", 1.64),
+    ("Na", 1, 4, "", 0.99), ("Na", 1, 6, "", 1.02), ("Na", 1, 8, "", 1.18), ("Na", 1, 12, "", 1.39),
+    ("Ca", 2, 6, "", 1.00), ("Ca", 2, 8, "", 1.12), ("Ca", 2, 12, "", 1.34),
+    ("Mg", 2, 4, "", 0.57), ("Mg", 2, 6, "", 0.72), ("Mg", 2, 8, "", 0.89),
+    ("Sr", 2, 6, "", 1.18), ("Sr", 2, 8, "", 1.26), ("Sr", 2, 12, "", 1.44),
+    ("Ba", 2, 6, "", 1.35), ("Ba", 2, 8, "", 1.42), ("Ba", 2, 12, "", 1.61),
+    ("Al", 3, 4, "", 0.39), ("Al", 3, 5, "", 0.48), ("Al", 3, 6, "", 0.535),
+    ("Si", 4, 4, "", 0.26), ("Si", 4, 6, "", 0.40),
+    ("Ti", 4, 4, "", 0.42), ("Ti", 4, 5, "", 0.51), ("Ti", 4, 6, "", 0.605), ("Ti", 4, 8, "", 0.74),
+    ("Zr", 4, 4, "", 0.59), ("Zr", 4, 6, "", 0.72), ("Zr", 4, 8, "", 0.84),
+    ("Fe", 2, 4, "HS", 0.63), ("Fe", 2, 6, "LS", 0.61), ("Fe", 2, 6, "HS", 0.78), ("Fe", 2, 8, "HS", 0.92),
+    ("Fe", 3, 4, "HS", 0.49), ("Fe", 3, 6, "LS", 0.55), ("Fe", 3, 6, "HS", 0.645), ("Fe", 3, 8, "HS", 0.78),
+    ("Mn", 2, 4, "HS", 0.66), ("Mn", 2, 6, "LS", 0.67), ("Mn", 2, 6, "HS", 0.83), ("Mn", 2, 8, "", 0.96),
+    ("Zn", 2, 4, "", 0.60), ("Zn", 2, 6, "", 0.74), ("Zn", 2, 8, "", 0.90),
+    ("Ni", 2, 4, "", 0.55), ("Ni", 2, 6, "", 0.69),
+    ("Cu", 1, 2, "", 0.46), ("Cu", 1, 4, "", 0.60), ("Cu", 1, 6, "", 0.77),
+    ("Ag", 1, 2, "", 0.67), ("Ag", 1, 4, "", 1.00), ("Ag", 1, 6, "", 1.15), ("Ag", 1, 8, "", 1.28),
+    ("Au", 1, 6, "", 1.37),
+    ("Hg", 2, 2, "", 0.69), ("Hg", 2, 4, "", 0.96), ("Hg", 2, 6, "", 1.02), ("Hg", 2, 8, "", 1.14),
+    ("Pb", 2, 4, "", 0.98), ("Pb", 2, 6, "", 1.19), ("Pb", 2, 8, "", 1.29), ("Pb", 2, 12, "", 1.49),
+    ("Cd", 2, 4, "", 0.78), ("Cd", 2, 6, "", 0.95), ("Cd", 2, 8, "", 1.10), ("Cd", 2, 12, "", 1.31),
+    ("C", 4, 3, "", 0.08), ("C", 4, 4, "", 0.15), ("C", 4, 6, "", 0.16),
+    ("S", 6, 4, "", 0.12), ("S", 6, 6, "", 0.29),
+    ("N", 5, 6, "", 0.13),
+    ("P", 5, 4, "", 0.17), ("P", 5, 5, "", 0.29), ("P", 5, 6, "", 0.38),
+    ("B", 3, 3, "", 0.01), ("B", 3, 4, "", 0.11), ("B", 3, 6, "", 0.27),
+    ("S", -2, 6, "", 1.84),
+    ("O", -2, 2, "", 1.35), ("O", -2, 3, "", 1.36), ("O", -2, 4, "", 1.38), ("O", -2, 6, "", 1.40), ("O", -2, 8, "", 1.42),
+]
+
+# Coordinación usada cuando no se especifica: VI, salvo los formadores tetraédricos
+DEFAULT_COORDINATION = 6
+PREFERRED_COORDINATION = {("Si", 4): 4, ("C", 4): 4}
+DEFAULT_SPIN = "HS"
+
+# Opciones de coordinación para los selectores de las páginas (etiqueta -> número)
+COORDINATION_OPTIONS = {"Por defecto (VI; IV en Si, C)": None, "IV": 4, "VI": 6, "VIII": 8, "XII": 12}
+
+# Índice multinivel con el Potencial Iónico ya calculado para cada entrada (IP = |z| / r)
+RADII = pd.DataFrame(SHANNON_RADII, columns=["ion", "charge", "coordination", "spin", "radius"])
+RADII["ip"] = RADII["charge"].abs() / RADII["radius"]
+RADII = RADII.set_index(["ion", "charge", "coordination", "spin"]).sort_index()
+
+_ION_PATTERN = re.compile(r"^([A-Z][a-z]?)(\d*)([+-])$")
+
+
+def parse_ion(symbol):
+    # "Fe3+" -> ("Fe", 3), "S2-" -> ("S", -2), "K+" -> ("K", 1)
+    match = _ION_PATTERN.match(symbol)
+    if match is None:
+        raise ValueError(f"Símbolo de ion no reconocido: {symbol!r}")
+    element, magnitude, sign = match.groups()
+    return element, int(magnitude or 1) * (1 if sign == "+" else -1)
+
+
+# Índice plano para búsquedas vectorizadas sin pasar por pandas: cada nivel del índice se
+# factoriza a enteros (niveles ordenados) y la clave de cada fila es el número en base mixta
+# de sus códigos. Como RADII está ordenado, esas claves quedan ordenadas: searchsorted da la fila.
+_LEVELS = [np.array(sorted(set(RADII.index.get_level_values(i)))) for i in range(RADII.index.nlevels)]
+_COORDINATION = RADII.index.get_level_values("coordination").to_numpy()
+_SPIN = RADII.index.get_level_values("spin").to_numpy()
+_RADIUS = RADII["radius"].to_numpy()
+_IP = RADII["ip"].to_numpy()
+
+
+def _codes(values, levels):
+    # Código de cada valor dentro de `levels` (ordenado, sin repetidos); -1 si no está.
+    # pd.factorize agrupa los valores en C; solo los distintos (unos pocos) se buscan en `levels`
+    inverse, uniques = pd.factorize(np.asarray(values, dtype=object))
+    uniques = np.asarray(uniques)
+    common = np.result_type(levels.dtype, uniques.dtype) # Sin truncar cadenas más largas que los niveles
+    levels, uniques = levels.astype(common), uniques.astype(common)
+    idx = np.searchsorted(levels, uniques).clip(max=len(levels) - 1)
+    return np.where(levels[idx] == uniques, idx, -1)[inverse]
+
+
+def _key(columns):
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    missing = np.zeros(len(columns[0]), dtype=bool)
+    for values, levels in zip(columns, _LEVELS):
+        codes = _codes(values, levels)
+        missing |= codes < 0
+        key = key * len(levels) + codes
+    return np.where(missing, -1, key)
+
+
+_TABLE_KEY = _key([RADII.index.get_level_values(i).to_numpy() for i in range(RADII.index.nlevels)])
+
+
+def _positions(ions, charges, coordinations, spins):
+    if not len(ions):
+        return np.zeros(0, dtype=int)
+    key = _key([ions, charges, coordinations, spins])
+    pos = np.searchsorted(_TABLE_KEY, key).clip(max=len(_TABLE_KEY) - 1)
+    return np.where((key >= 0) & (_TABLE_KEY[pos] == key), pos, -1)
+
+
+def lookup_radii(symbols, coordination=None, spin=None):
+    """Radio e IP de cada ion ("Fe3+", ...) para la coordinación/espín pedidos.
+
+    `coordination` y `spin` pueden ser un escalar o una secuencia alineada con `symbols`.
+    Sin coordinación (o si el ion no tiene esa coordinación) se usa la de por defecto del ion;
+    sin espín se prefiere alto espín cuando existe. Los iones sin estados de espín (entrada "")
+    se encuentran con cualquier espín pedido. Devuelve un DataFrame alineado con
+    `symbols` con columnas radius, ip, coordination, spin (NaN si no hay entrada).
+    """
+    # Cada símbolo distinto se interpreta una sola vez
+    inverse, uniques = pd.factorize(np.asarray(symbols, dtype=object))
+    parsed = [parse_ion(s) for s in uniques]
+    ions = np.array([ion for ion, _ in parsed], dtype=object)[inverse]
+    charges = np.array([charge for _, charge in parsed], dtype=int)[inverse]
+    default_cn = np.array([PREFERRED_COORDINATION.get(key, DEFAULT_COORDINATION) for key in parsed], dtype=int)[inverse]
+    n = len(ions)
+    cn = default_cn if coordination is None else np.broadcast_to(coordination, (n,))
+    spins = np.broadcast_to(DEFAULT_SPIN if spin is None else spin, (n,))
+    spinless = np.broadcast_to("", (n,))
+
+    def resolve(cn):
+        pos = _positions(ions, charges, cn, spins)
+        return np.where(pos < 0, _positions(ions, charges, cn, spinless), pos) # Iones sin espín
+
+    pos = resolve(cn)
+    pos = np.where(pos < 0, resolve(default_cn), pos) # Coordinación inexistente -> la de por defecto
+    found = pos >= 0
+    return pd.DataFrame({
+        "radius": np.where(found, _RADIUS[pos], np.nan),
+        "ip": np.where(found, _IP[pos], np.nan),
+        "coordination": pd.Series(_COORDINATION[pos]).where(found),
+        "spin": np.where(found, _SPIN[pos], None),
+    })
+
+
+# Radio e IP del diccionario maestro: derivados de la tabla de Shannon, no escritos a mano
+for _symbol, _row in zip(ELEMENTS, lookup_radii(list(ELEMENTS)).itertuples()):
+    ELEMENTS[_symbol]["radius"] = _row.radius
+    ELEMENTS[_symbol]["ip"] = _row.ip
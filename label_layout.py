@@ -0,0 +1,137 @@
+# Disposición de Etiquetas sin Solapes (La Tabla Maestra)
+# Reemplaza el jitter aleatorio: coloca cada marcador cerca de su columna (X_Base) a su altura
+# real (IP) y elige para su etiqueta una de las posiciones de texto de Plotly donde no choque
+# con ningún otro marcador ni etiqueta. Determinista: mismos iones => misma disposición.
+#
+# Todo se calcula en píxeles sobre un lienzo nominal del tamaño del gráfico, con un índice
+# espacial de rejilla para que cada consulta solo mire las cajas vecinas.
+
+from collections import namedtuple
+
+import numpy as np
+
+# Cambia si cambia el algoritmo: forma parte de la clave del paquete estático
+LAYOUT_VERSION = 2
+
+# Posiciones de texto de Plotly en orden de preferencia: (nombre, dirección x, dirección y)
+LABEL_POSITIONS = (
+    ("top center", 0, 1), ("bottom center", 0, -1), ("middle right", 1, 0), ("middle left", -1, 0),
+    ("top right", 1, 1), ("top left", -1, 1), ("bottom right", 1, -1), ("bottom left", -1, -1),
+)
+
+Layout = namedtuple("Layout", ["x", "textposition", "collisions"])
+
+
+class BoxIndex:
+    """Rejilla uniforme de cajas (x0, y0, x1, y1) para detectar solapes en O(vecinos)."""
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.cells = {}
+        self.size = 0
+
+    def _keys(self, box):
+        c = self.cell
+        x0, y0, x1, y1 = box
+        return [(i, j) for i in range(int(x0 // c), int(x1 // c) + 1) for j in range(int(y0 // c), int(y1 // c) + 1)]
+
+    def add(self, box):
+        entry = (*box, self.size) # Con id: dos cajas idénticas cuentan como dos
+        self.size += 1
+        for key in self._keys(box):
+            self.cells.setdefault(key, []).append(entry)
+
+    def count(self, box, limit=None):
+        # Número de cajas que solapan a `box` (sin contar bordes que solo se tocan);
+        # con `limit` deja de buscar al llegar a ese número
+        x0, y0, x1, y1 = box
+        cells = self.cells
+        seen = set()
+        for key in self._keys(box):
+            for other in cells.get(key, ()):
+                if other[0] < x1 and x0 < other[2] and other[1] < y1 and y0 < other[3]:
+                    seen.add(other)
+                    if limit is not None and len(seen) >= limit:
+                        return len(seen)
+        return len(seen)
+
+
+def _label_box(cx, cy, dx, dy, w, h, r):
+    # Caja del texto de Plotly alrededor de un marcador de radio r centrado en (cx, cy)
+    x0 = cx - w / 2 if dx == 0 else (cx + r if dx > 0 else cx - r - w)
+    y0 = cy - h / 2 if dy == 0 else (cy + r if dy > 0 else cy - r - h)
+    return (x0, y0, x0 + w, y0 + h)
+
+
+def legend_box(names, width, height, x=0.01, y=0.99, font_size=12):
+    # Caja aproximada (por exceso) de una leyenda vertical de Plotly anclada por su esquina
+    # superior izquierda en (x, y) del papel: ~24 px por entrada, símbolo de 40 px + texto
+    w = 40 + font_size * 0.65 * max((len(str(n)) for n in names), default=0) + 10
+    h = 24 * len(names) + 10
+    x0, y1 = x * width, y * height
+    return (x0, y1 - h, x0 + w, y1)
+
+
+def layout_labels(x, y, labels, x_range, y_range, width=800, height=600,
+                  marker_size=25, font_size=12, max_shift=0.4, gap=2, obstacles=()):
+    """Posiciones X finales y `textposition` por punto, sin solapes si caben.
+
+    x: posición base de cada punto (su columna); y: altura fija (no se mueve nunca).
+    Cada punto prueba desplazamientos horizontales hasta `max_shift` (unidades de datos),
+    alternando derecha/izquierda, y para cada uno las posiciones de LABEL_POSITIONS; se queda
+    con el primer par (marcador, etiqueta) que no toca nada ya colocado ni sale del lienzo.
+    `collisions` cuenta los puntos sin sitio libre (quedan en la opción con menos choques).
+    `obstacles`: cajas en píxeles del área de trazado (origen abajo a la izquierda) que ya
+    están ocupadas, p. ej. la leyenda (`legend_box`).
+
+    `width` y `height` deben ser los del área de trazado real: la figura tiene que fijar ese
+    tamaño (márgenes fijos, sin autoajuste al contenedor) o los solapes vuelven.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    sx = width / (x_range[1] - x_range[0])
+    sy = height / (y_range[1] - y_range[0])
+    px = ((x - x_range[0]) * sx).tolist() # Floats de Python: más rápidos que escalares NumPy
+    py = ((y - y_range[0]) * sy).tolist()
+
+    r = marker_size / 2
+    h = font_size * 1.2
+    widths = [font_size * 0.6 * len(str(label)) for label in labels]
+    step = (marker_size + gap) / 2 # Medio marcador: deja encajar etiquetas más anchas que él
+    n_shifts = int(max_shift * sx // step)
+    shifts = [0.0] + [s * k * step for k in range(1, n_shifts + 1) for s in (1, -1)]
+
+    visible = [i for i in range(len(py)) if 0 <= py[i] <= height] # Fuera del eje Y: Plotly no los dibuja
+    order = sorted(visible, key=lambda i: (x[i], y[i], str(labels[i])))
+    index = BoxIndex(cell=max(marker_size + gap, h, max(widths, default=0)))
+    for box in obstacles:
+        index.add(box)
+    final_px = list(px)
+    collisions = 0
+
+    textposition = ["top center"] * len(x)
+    for i in order:
+        best = None
+        for shift in shifts:
+            cx = px[i] + shift
+            marker = (cx - r - gap / 2, py[i] - r - gap / 2, cx + r + gap / 2, py[i] + r + gap / 2)
+            marker_hits = index.count(marker, limit=best and best[0])
+            if best is not None and marker_hits >= best[0]:
+                continue # Este desplazamiento no puede mejorar la mejor opción
+            for name, dx, dy in LABEL_POSITIONS:
+                label = _label_box(cx, py[i], dx, dy, widths[i], h, r + gap)
+                outside = label[0] < 0 or label[2] > width or label[1] < 0 or label[3] > height
+                limit = best[0] - marker_hits - outside if best else None
+                hits = marker_hits + index.count(label, limit) + outside
+                if best is None or hits < best[0]:
+                    best = (hits, cx, name, marker, label)
+                if hits == 0:
+                    break
+            if best[0] == 0:
+                break
+        hits, final_px[i], textposition[i], marker, label = best
+        collisions += hits > 0
+        index.add(marker)
+        index.add(label)
+
+    return Layout(np.array(final_px) / sx + x_range[0], textposition, collisions)
@@ -0,0 +1,303 @@
+# Evolución Temporal del Paisaje (Génesis)
+# La montaña se erosiona hacia el mar paso a paso (difusión de laderas) mientras el cuarzo
+# viaja a la playa, las arcillas reptan por la ladera y los solutos terminan en el mar.
+#
+# Los frames se generan de forma perezosa y se envían al navegador como deltas compactos:
+# solo las celdas de altura y las partículas que cambiaron al menos un cuanto desde el
+# último envío, cuantizadas a enteros. Un pequeño reproductor JS reconstruye cada frame.
+# El reproductor es un componente de Streamlit (index.html + plotly.js del paquete plotly
+# instalado, en una carpeta generada): Streamlit sirve plotly.js como archivo estático cacheable
+# y el iframe del componente sigue montado entre reruns, así que la librería (~4.8 MB) se
+# descarga una vez por vista y por cada render solo viajan la figura base y los deltas.
+# Funciona sin internet y con la misma versión de plotly.js que serializa las figuras.
+
+import base64
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+import plotly
+from plotly.offline import get_plotlyjs
+
+HEIGHT_QUANTUM = 0.01 # Unidades de altura por entero enviado
+POSITION_QUANTUM = 0.02 # Unidades de posición por entero enviado
+GROUPS = ("quartz", "clay", "solutes")
+PLOTLYJS_FILE = f"plotly-{plotly.__version__}.min.js" # Nombre con versión: el archivo nunca cambia
+
+
+def initial_terrain():
+    # Misma topografía que la vista estática: montaña (x < 0) que baja al fondo marino (x > 0)
+    x = np.linspace(-10, 10, 50) # -10 a 0 = Montaña, 0 a 10 = Mar
+    y = np.linspace(-5, 5, 25)
+    X, Y = np.meshgrid(x, y)
+    Z = -5 * np.tanh(X/4) # Genera una pendiente suave de +5 a -5
+    Z += 0.5 * np.sin(Y) * np.exp(-(X)**2 / 10) # Añadir "valles" en la montaña
+    return X, Y, Z
+
+
+class LandscapeEvolution:
+    """Estado del paisaje que avanza un paso de tiempo con cada `step()`."""
+
+    def __init__(self, seed=0, n_quartz=100, n_clay=100, n_solutes=150, erosion=0.02):
+        rng = np.random.default_rng(seed)
+        self.X, self.Y, self.Z = initial_terrain()
+        self.dx = self.X[0, 1] - self.X[0, 0]
+        self.dy = self.Y[1, 0] - self.Y[0, 0]
+        self.erosion = erosion # kappa * dt; estable mientras erosion / dx^2 < 0.25
+        self.rng = rng
+
+        # Todos los granos nacen en la montaña: la meteorización los libera de la roca
+        counts = {"quartz": n_quartz, "clay": n_clay, "solutes": n_solutes}
+        n = sum(counts.values())
+        self.slices, start = {}, 0
+        for group in GROUPS:
+            self.slices[group] = slice(start, start + counts[group])
+            start += counts[group]
+
+        self.pos = np.empty((n, 3))
+        self.pos[:, 0] = rng.uniform(-9, -2, n)
+        self.pos[:, 1] = rng.uniform(-5, 5, n)
+        self.target = np.empty((n, 3))
+        q, c, s = (self.slices[g] for g in GROUPS)
+        self.target[q, 0] = rng.normal(0, 1.5, counts["quartz"]) # Playa
+        self.target[c, 0] = np.minimum(self.pos[c, 0] + 1.0, -2) # Reptación corta ladera abajo
+        self.target[s, 0] = rng.uniform(2, 9, counts["solutes"]) # Mar abierto
+        self.target[s, 2] = rng.uniform(-4, -0.5, counts["solutes"]) # Disueltos bajo el agua
+        self.rate = np.empty(n)
+        self.rate[q] = rng.uniform(0.01, 0.03, counts["quartz"])
+        self.rate[c] = rng.uniform(0.002, 0.006, counts["clay"])
+        self.rate[s] = rng.uniform(0.03, 0.06, counts["solutes"])
+        self._settle_heights()
+
+    def _surface_height(self, x, y):
+        ix = np.clip(np.rint((x - self.X[0, 0]) / self.dx).astype(int), 0, self.X.shape[1] - 1)
+        iy = np.clip(np.rint((y - self.Y[0, 0]) / self.dy).astype(int), 0, self.Y.shape[0] - 1)
+        return self.Z[iy, ix]
+
+    def _settle_heights(self):
+        x, y = self.pos[:, 0], self.pos[:, 1]
+        z = self._surface_height(x, y) + 0.3 # Encima del terreno
+        s = self.slices["solutes"]
+        in_sea = x[s] > 1
+        z[s] = np.where(in_sea, self.target[s, 2], z[s]) # En el mar, flotando disueltos
+        self.pos[:, 2] = z
+
+    def step(self):
+        # 1. Erosión: difusión de laderas (bordes con pendiente nula)
+        Zp = np.pad(self.Z, 1, mode="edge")
+        lap = ((Zp[1:-1, 2:] + Zp[1:-1, :-2] - 2 * self.Z) / self.dx**2 +
+               (Zp[2:, 1:-1] + Zp[:-2, 1:-1] - 2 * self.Z) / self.dy**2)
+        self.Z += self.erosion * lap
+
+        # 2. Transporte: cada grano se acerca a su destino con su propia rapidez
+        self.pos[:, 0] += self.rate * (self.target[:, 0] - self.pos[:, 0])
+        self.pos[:, 1] = np.clip(self.pos[:, 1] + self.rng.normal(0, 0.01, len(self.pos)), -5, 5)
+        self._settle_heights()
+
+    def particles(self):
+        # {grupo: (x, y, z)} con las posiciones actuales
+        return {g: tuple(self.pos[self.slices[g]].T) for g in GROUPS}
+
+    def frames(self, steps):
+        # Generador perezoso: (alturas, posiciones) después de cada paso
+        for _ in range(steps):
+            self.step()
+            yield self.Z, self.pos
+
+
+def _b64(array):
+    return base64.b64encode(np.ascontiguousarray(array).tobytes()).decode("ascii")
+
+
+def encode_evolution(evolution, steps):
+    """Consume `evolution.frames(steps)` y devuelve el payload de deltas para el reproductor.
+
+    Solo se envían las celdas/partículas cuyo valor cuantizado cambió desde el último envío,
+    así que el tamaño crece con lo que realmente se mueve, no con steps x tamaño del frame.
+    """
+    z_sent = np.rint(evolution.Z / HEIGHT_QUANTUM).astype(np.int32)
+    p_sent = np.rint(evolution.pos / POSITION_QUANTUM).astype(np.int16)
+    base_z, base_p = z_sent.copy(), p_sent.copy()
+
+    z_idx, z_delta, z_off = [], [], [0]
+    p_idx, p_xyz, p_off = [], [], [0]
+    for Z, pos in evolution.frames(steps):
+        zq = np.rint(Z / HEIGHT_QUANTUM).astype(np.int32)
+        changed = np.flatnonzero(zq != z_sent)
+        z_idx.append(changed.astype(np.uint16))
+        z_delta.append((zq.ravel()[changed] - z_sent.ravel()[changed]).astype(np.int16))
+        z_sent.ravel()[changed] = zq.ravel()[changed]
+        z_off.append(z_off[-1] + len(changed))
+
+        pq = np.rint(pos / POSITION_QUANTUM).astype(np.int16)
+        moved = np.flatnonzero((pq != p_sent).any(axis=1))
+        p_idx.append(moved.astype(np.uint16))
+        p_xyz.append(pq[moved])
+        p_sent[moved] = pq[moved]
+        p_off.append(p_off[-1] + len(moved))
+
+    payload = {
+        "steps": steps,
+        "shape": list(base_z.shape),
+        "z_quantum": HEIGHT_QUANTUM,
+        "p_quantum": POSITION_QUANTUM,
+        "groups": {g: [evolution.slices[g].start, evolution.slices[g].stop] for g in GROUPS},
+        "base_z": _b64(base_z),
+        "base_p": _b64(base_p),
+        "z_idx": _b64(np.concatenate(z_idx)),
+        "z_delta": _b64(np.concatenate(z_delta)),
+        "z_off": _b64(np.array(z_off, dtype=np.int32)),
+        "p_idx": _b64(np.concatenate(p_idx)),
+        "p_xyz": _b64(np.concatenate(p_xyz).reshape(-1)),
+        "p_off": _b64(np.array(p_off, dtype=np.int32)),
+    }
+    return payload
+
+
+# Componente de Streamlit (protocolo v1 escrito a mano: componentReady -> render -> setFrameHeight).
+# Los argumentos de cada render son {figure, payload, traces, height, version}.
+PLAYER_INDEX = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<script src="__PLOTLYJS_FILE__"></script>
+<style>body { margin: 0; background: transparent; }</style>
+</head><body>
+<div id="plot"></div>
+<div style="display:flex;gap:8px;align-items:center;font-family:sans-serif;color:#e0e0e0">
+  <button id="play">▶️</button>
+  <input id="scrub" type="range" min="0" max="0" value="0" style="flex:1">
+  <span id="label">t = 0</span>
+</div>
+<script>
+function post(type, data) { window.parent.postMessage(Object.assign({isStreamlitMessage: true, type: type}, data), "*"); }
+function dec(b64, T) {
+  const bin = atob(b64), buf = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) buf[i] = bin.charCodeAt(i);
+  return new T(buf.buffer);
+}
+let P, TRACES, ny, nx, baseZ, baseP, zIdx, zDelta, zOff, pIdx, pXyz, pOff, z, p, t = 0, timer = null, shown = null;
+const scrub = document.getElementById("scrub");
+
+function setup(args) {
+  if (timer) { clearInterval(timer); timer = null; }
+  P = args.payload; TRACES = args.traces;
+  [ny, nx] = P.shape;
+  baseZ = dec(P.base_z, Int32Array); baseP = dec(P.base_p, Int16Array);
+  zIdx = dec(P.z_idx, Uint16Array); zDelta = dec(P.z_delta, Int16Array); zOff = dec(P.z_off, Int32Array);
+  pIdx = dec(P.p_idx, Uint16Array); pXyz = dec(P.p_xyz, Int16Array); pOff = dec(P.p_off, Int32Array);
+  z = baseZ.slice(); p = baseP.slice(); t = 0;
+  scrub.max = P.steps; scrub.value = 0;
+  document.getElementById("plot").style.height = args.height + "px";
+  Plotly.react("plot", args.figure.data, args.figure.layout, {responsive: true}).then(() => {
+    goTo(0);
+    post("streamlit:setFrameHeight", {height: document.body.scrollHeight});
+  });
+}
+
+function apply(k) { // Frame k (1..steps) sobre el estado del frame k-1
+  for (let i = zOff[k - 1]; i < zOff[k]; i++) z[zIdx[i]] += zDelta[i];
+  for (let i = pOff[k - 1]; i < pOff[k]; i++) {
+    const j = pIdx[i];
+    p[3 * j] = pXyz[3 * i]; p[3 * j + 1] = pXyz[3 * i + 1]; p[3 * j + 2] = pXyz[3 * i + 2];
+  }
+}
+function goTo(k) {
+  if (k < t) { z = baseZ.slice(); p = baseP.slice(); t = 0; } // Retroceder: reconstruir desde la base
+  while (t < k) apply(++t);
+  render();
+}
+function render() {
+  const rows = [];
+  for (let r = 0; r < ny; r++) rows.push(Array.from(z.subarray(r * nx, (r + 1) * nx), v => v * P.z_quantum));
+  Plotly.restyle("plot", {z: [rows]}, [TRACES.terrain]);
+  const update = {x: [], y: [], z: []}, idx = [];
+  for (const [group, trace] of Object.entries(TRACES.particles)) {
+    const [a, b] = P.groups[group], xs = [], ys = [], zs = [];
+    for (let j = a; j < b; j++) { xs.push(p[3*j] * P.p_quantum); ys.push(p[3*j+1] * P.p_quantum); zs.push(p[3*j+2] * P.p_quantum); }
+    update.x.push(xs); update.y.push(ys); update.z.push(zs); idx.push(trace);
+  }
+  if (idx.length) Plotly.restyle("plot", update, idx);
+  document.getElementById("label").textContent = "t = " + t;
+}
+scrub.addEventListener("input", () => goTo(+scrub.value));
+document.getElementById("play").addEventListener("click", () => {
+  if (!P) return;
+  if (timer) { clearInterval(timer); timer = null; return; }
+  if (t >= P.steps) goTo(0);
+  timer = setInterval(() => {
+    if (t >= P.steps) { clearInterval(timer); timer = null; return; }
+    goTo(t + 1); scrub.value = t;
+  }, 40);
+});
+
+window.addEventListener("message", event => {
+  if (!event.data || event.data.type !== "streamlit:render") return;
+  const args = event.data.args;
+  if (args.version === shown) return; // Rerun sin cambios: el reproductor sigue donde estaba
+  shown = args.version;
+  setup(args);
+});
+post("streamlit:componentReady", {apiVersion: 1});
+</script>
+</body></html>
+"""
+
+
+def player_dir(root=None):
+    """Carpeta del componente reproductor (index.html + plotly.js), generada una vez por versión.
+
+    Va fuera del repo (en el temporal del sistema por defecto): plotly.js sale del paquete
+    plotly instalado y no se versiona. El nombre lleva un hash del contenido, así que una
+    versión nueva de plotly o del reproductor usa otra carpeta.
+    """
+    index = PLAYER_INDEX.replace("__PLOTLYJS_FILE__", PLOTLYJS_FILE).encode("utf-8")
+    digest = hashlib.sha256(index).hexdigest()[:12]
+    path = os.path.join(root or tempfile.gettempdir(), f"atlas-player-{digest}")
+    os.makedirs(path, exist_ok=True)
+    for name, content in ((PLOTLYJS_FILE, lambda: get_plotlyjs().encode("utf-8")), ("index.html", lambda: index)):
+        target = os.path.join(path, name)
+        if not os.path.exists(target):
+            # Escritura atómica: otro proceso del servidor puede estar sirviendo la carpeta
+            fd, tmp = tempfile.mkstemp(dir=path)
+            with os.fdopen(fd, "wb") as f:
+                f.write(content())
+            os.replace(tmp, target)
+    return path
+
+
+def player_component():
+    # declare_component necesita un módulo importable: desde el script de una página falla.
+    # Se declara en cada llamada (barato) por si el runtime de Streamlit cambió
+    import streamlit.components.v1 as components
+    return components.declare_component("landscape_player", path=player_dir())
+
+
+def player_args(figure, payload, traces, height=600, version=""):
+    """Argumentos de un render del reproductor: figura base + deltas + trazas a animar.
+
+    `traces` indica qué trazas de `figure` se animan: {"terrain": i, "particles": {grupo: j}}.
+    `version` identifica la animación: si no cambia entre reruns, el navegador no la recarga.
+    """
+    return {"figure": json.loads(figure.to_json()), "payload": payload, "traces": traces,
+            "height": height, "version": version}
+
+
+def payload_stats(args, plotlyjs_bytes=None):
+    """Bytes que recibe el navegador por vista frente a enviar cada frame completo como JSON de Plotly.
+
+    `render_bytes` viaja en cada render (figura base + deltas); plotly.js se descarga una vez
+    por vista del reproductor y `view_bytes` es el total de esa primera carga.
+    """
+    payload = args["payload"]
+    ny, nx = payload["shape"]
+    n_particles = max(stop for _, stop in payload["groups"].values())
+    delta_bytes = len(json.dumps(payload))
+    render_bytes = len(json.dumps(args))
+    if plotlyjs_bytes is None:
+        plotlyjs_bytes = len(get_plotlyjs().encode("utf-8"))
+    # ~18 bytes por número en texto: alturas + x, y, z de cada partícula, en cada frame
+    full_bytes = payload["steps"] * (ny * nx + 3 * n_particles) * 18
+    return {"delta_bytes": delta_bytes, "render_bytes": render_bytes, "plotlyjs_bytes": plotlyjs_bytes,
+            "view_bytes": render_bytes + plotlyjs_bytes, "full_bytes": full_bytes,
+            "ratio": full_bytes / render_bytes}
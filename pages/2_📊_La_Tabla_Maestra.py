@@ -1,7 +1,10 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
-import numpy as np
+
+import label_layout
+import static_bundle
+from geodata_core import COORDINATION_OPTIONS, lookup_radii
 
 # --- Configuración de la Página ---
 st.set_page_config(
@@ -12,54 +15,54 @@ st.set_page_config(
 
 # --- Diccionario de Datos Geoquímicos (Railsback) ---
 # Datos basados en L. Bruce Railsback's "An Earth Scientist's Periodic Table of the Elements and Their Ions"
-# Radios iónicos (r) en Angstroms (Shannon-Prewitt, Coordinación VI generalmente)
+# Radios iónicos (r) en Angstroms: tabla de Shannon en geodata_core, por coordinación
+# (VI por defecto; IV para los formadores tetraédricos Si4+ y C4+)
 # Carga (z)
-# IP = z / r
+# IP = z / r (precalculado para cada entrada de la tabla de radios)
 
 data = [
     # --- CATIONES DUROS (Tipo A) ---
     # Gases Nobles (Configuración) - Lithophiles
-    {"Simbolo": "K+", "Nombre": "Potasio", "Carga": 1, "Radio": 1.38, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Nutriente mayor", "Z": 19},
-    {"Simbolo": "Na+", "Nombre": "Sodio", "Carga": 1, "Radio": 1.02, "Grupo": "Duros (Tipo A)", "Nota": "Muy Soluble, Agua Salada", "Z": 11},
-    {"Simbolo": "Ca2+", "Nombre": "Calcio", "Carga": 2, "Radio": 1.00, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Carbonatos", "Z": 20},
-    {"Simbolo": "Mg2+", "Nombre": "Magnesio", "Carga": 2, "Radio": 0.72, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Clorofila", "Z": 12},
-    {"Simbolo": "Sr2+", "Nombre": "Estroncio", "Carga": 2, "Radio": 1.18, "Grupo": "Duros (Tipo A)", "Nota": "Traza, sustituye Ca", "Z": 38},
-    {"Simbolo": "Ba2+", "Nombre": "Bario", "Carga": 2, "Radio": 1.35, "Grupo": "Duros (Tipo A)", "Nota": "Barita (Insoluble SO4)", "Z": 56},
+    {"Simbolo": "K+", "Nombre": "Potasio", "Carga": 1, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Nutriente mayor", "Z": 19},
+    {"Simbolo": "Na+", "Nombre": "Sodio", "Carga": 1, "Grupo": "Duros (Tipo A)", "Nota": "Muy Soluble, Agua Salada", "Z": 11},
+    {"Simbolo": "Ca2+", "Nombre": "Calcio", "Carga": 2, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Carbonatos", "Z": 20},
+    {"Simbolo": "Mg2+", "Nombre": "Magnesio", "Carga": 2, "Grupo": "Duros (Tipo A)", "Nota": "Soluble, Clorofila", "Z": 12},
+    {"Simbolo": "Sr2+", "Nombre": "Estroncio", "Carga": 2, "Grupo": "Duros (Tipo A)", "Nota": "Traza, sustituye Ca", "Z": 38},
+    {"Simbolo": "Ba2+", "Nombre": "Bario", "Carga": 2, "Grupo": "Duros (Tipo A)", "Nota": "Barita (Insoluble SO4)", "Z": 56},
     
     # Alta Carga / Radio Pequeño (Insolubles/Hidrolizados)
-    {"Simbolo": "Al3+", "Nombre": "Aluminio", "Carga": 3, "Radio": 0.54, "Grupo": "Duros (Tipo A)", "Nota": "Insoluble, Arcillas", "Z": 13},
-    {"Simbolo": "Si4+", "Nombre": "Silicio", "Carga": 4, "Radio": 0.26, "Grupo": "Aniones (Formadores)", "Nota": "Insoluble (SiO2) / Silicatos", "Z": 14}, # Si4+ a veces se trata aparte
-    {"Simbolo": "Ti4+", "Nombre": "Titanio", "Carga": 4, "Radio": 0.61, "Grupo": "Duros (Tipo A)", "Nota": "Muy Insoluble (Rutilo)", "Z": 22},
-    {"Simbolo": "Zr4+", "Nombre": "Circonio", "Carga": 4, "Radio": 0.72, "Grupo": "Duros (Tipo A)", "Nota": "Muy Insoluble (Circón)", "Z": 40},
+    {"Simbolo": "Al3+", "Nombre": "Aluminio", "Carga": 3, "Grupo": "Duros (Tipo A)", "Nota": "Insoluble, Arcillas", "Z": 13},
+    {"Simbolo": "Si4+", "Nombre": "Silicio", "Carga": 4, "Grupo": "Aniones (Formadores)", "Nota": "Insoluble (SiO2) / Silicatos", "Z": 14}, # Si4+ a veces se trata aparte
+    {"Simbolo": "Ti4+", "Nombre": "Titanio", "Carga": 4, "Grupo": "Duros (Tipo A)", "Nota": "Muy Insoluble (Rutilo)", "Z": 22},
+    {"Simbolo": "Zr4+", "Nombre": "Circonio", "Carga": 4, "Grupo": "Duros (Tipo A)", "Nota": "Muy Insoluble (Circón)", "Z": 40},
     
     # --- INTERMEDIOS (Transición) ---
-    {"Simbolo": "Fe2+", "Nombre": "Hierro (II)", "Carga": 2, "Radio": 0.78, "Grupo": "Intermedios", "Nota": "Soluble en anoxia", "Z": 26},
-    {"Simbolo": "Fe3+", "Nombre": "Hierro (III)", "Carga": 3, "Radio": 0.65, "Grupo": "Intermedios", "Nota": "Insoluble (Óxidos rojos)", "Z": 26},
-    {"Simbolo": "Mn2+", "Nombre": "Manganeso (II)", "Carga": 2, "Radio": 0.83, "Grupo": "Intermedios", "Nota": "Móvil en reducción", "Z": 25},
-    {"Simbolo": "Zn2+", "Nombre": "Zinc", "Carga": 2, "Radio": 0.74, "Grupo": "Intermedios", "Nota": "Nutriente traza / Sulfuros", "Z": 30},
-    {"Simbolo": "Ni2+", "Nombre": "Níquel", "Carga": 2, "Radio": 0.69, "Grupo": "Intermedios", "Nota": "Siderófilo/Calcófilo", "Z": 28},
+    {"Simbolo": "Fe2+", "Nombre": "Hierro (II)", "Carga": 2, "Grupo": "Intermedios", "Nota": "Soluble en anoxia", "Z": 26},
+    {"Simbolo": "Fe3+", "Nombre": "Hierro (III)", "Carga": 3, "Grupo": "Intermedios", "Nota": "Insoluble (Óxidos rojos)", "Z": 26},
+    {"Simbolo": "Mn2+", "Nombre": "Manganeso (II)", "Carga": 2, "Grupo": "Intermedios", "Nota": "Móvil en reducción", "Z": 25},
+    {"Simbolo": "Zn2+", "Nombre": "Zinc", "Carga": 2, "Grupo": "Intermedios", "Nota": "Nutriente traza / Sulfuros", "Z": 30},
+    {"Simbolo": "Ni2+", "Nombre": "Níquel", "Carga": 2, "Grupo": "Intermedios", "Nota": "Siderófilo/Calcófilo", "Z": 28},
     
     # --- CATIONES BLANDOS (Tipo B) ---
     # Afinidad por el Azufre (Calcófilos)
-    {"Simbolo": "Cu+", "Nombre": "Cobre (I)", "Carga": 1, "Radio": 0.77, "Grupo": "Blandos (Tipo B)", "Nota": "Sulfuros insolubles", "Z": 29},
-    {"Simbolo": "Ag+", "Nombre": "Plata", "Carga": 1, "Radio": 1.15, "Grupo": "Blandos (Tipo B)", "Nota": "Metales preciosos", "Z": 47},
-    {"Simbolo": "Au+", "Nombre": "Oro", "Carga": 1, "Radio": 1.37, "Grupo": "Blandos (Tipo B)", "Nota": "Inerte / Complejos", "Z": 79},
-    {"Simbolo": "Hg2+", "Nombre": "Mercurio", "Carga": 2, "Radio": 1.02, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, líquido", "Z": 80},
-    {"Simbolo": "Pb2+", "Nombre": "Plomo", "Carga": 2, "Radio": 1.19, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, Galena", "Z": 82},
-    {"Simbolo": "Cd2+", "Nombre": "Cadmio", "Carga": 2, "Radio": 0.95, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, sustituye Zn", "Z": 48},
+    {"Simbolo": "Cu+", "Nombre": "Cobre (I)", "Carga": 1, "Grupo": "Blandos (Tipo B)", "Nota": "Sulfuros insolubles", "Z": 29},
+    {"Simbolo": "Ag+", "Nombre": "Plata", "Carga": 1, "Grupo": "Blandos (Tipo B)", "Nota": "Metales preciosos", "Z": 47},
+    {"Simbolo": "Au+", "Nombre": "Oro", "Carga": 1, "Grupo": "Blandos (Tipo B)", "Nota": "Inerte / Complejos", "Z": 79},
+    {"Simbolo": "Hg2+", "Nombre": "Mercurio", "Carga": 2, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, líquido", "Z": 80},
+    {"Simbolo": "Pb2+", "Nombre": "Plomo", "Carga": 2, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, Galena", "Z": 82},
+    {"Simbolo": "Cd2+", "Nombre": "Cadmio", "Carga": 2, "Grupo": "Blandos (Tipo B)", "Nota": "Tóxico, sustituye Zn", "Z": 48},
     
     # --- ANIONES (Formadores de Complejos) ---
     # Alto Potencial Iónico -> Forman oxianiones
-    {"Simbolo": "C4+", "Nombre": "Carbono", "Carga": 4, "Radio": 0.15, "Grupo": "Aniones (Formadores)", "Nota": "Forma CO3-- (soluble/carb)", "Z": 6},
-    {"Simbolo": "S6+", "Nombre": "Azufre (VI)", "Carga": 6, "Radio": 0.29, "Grupo": "Aniones (Formadores)", "Nota": "Forma SO4-- (soluble)", "Z": 16},
-    {"Simbolo": "N5+", "Nombre": "Nitrógeno", "Carga": 5, "Radio": 0.13, "Grupo": "Aniones (Formadores)", "Nota": "Forma NO3- (muy soluble)", "Z": 7},
-    {"Simbolo": "P5+", "Nombre": "Fósforo", "Carga": 5, "Radio": 0.38, "Grupo": "Aniones (Formadores)", "Nota": "Forma PO4--- (nutriente)", "Z": 15},
-    {"Simbolo": "B3+", "Nombre": "Boro", "Carga": 3, "Radio": 0.27, "Grupo": "Aniones (Formadores)", "Nota": "Forma Boratos", "Z": 5},
+    {"Simbolo": "C4+", "Nombre": "Carbono", "Carga": 4, "Grupo": "Aniones (Formadores)", "Nota": "Forma CO3-- (soluble/carb)", "Z": 6},
+    {"Simbolo": "S6+", "Nombre": "Azufre (VI)", "Carga": 6, "Grupo": "Aniones (Formadores)", "Nota": "Forma SO4-- (soluble)", "Z": 16},
+    {"Simbolo": "N5+", "Nombre": "Nitrógeno", "Carga": 5, "Grupo": "Aniones (Formadores)", "Nota": "Forma NO3- (muy soluble)", "Z": 7},
+    {"Simbolo": "P5+", "Nombre": "Fósforo", "Carga": 5, "Grupo": "Aniones (Formadores)", "Nota": "Forma PO4--- (nutriente)", "Z": 15},
+    {"Simbolo": "B3+", "Nombre": "Boro", "Carga": 3, "Grupo": "Aniones (Formadores)", "Nota": "Forma Boratos", "Z": 5},
 ]
 
 # --- Procesamiento de Datos ---
 df = pd.DataFrame(data)
-df['Potencial_Ionico'] = df['Carga'] / df['Radio']
 
 # Asignar coordenadas X categóricas simuladas para el gráfico
 # Mapeo de grupos a posiciones base en X
@@ -79,54 +82,53 @@ df['X_Base'] = df['Grupo'].map(group_map)
 # Manejar los que no mapearon bien (por seguridad)
 df['X_Base'] = df['X_Base'].fillna(2)
 
-# Añadir Jitter (Ruido aleatorio) para evitar superposición
-np.random.seed(42) # Para reproducibilidad
-df['X_Final'] = df['X_Base'] + np.random.uniform(-0.15, 0.15, size=len(df))
+# Posición final (X_Final) y de la etiqueta (Text_Pos) sin solapes: ver label_layout.
+# Depende de qué iones se muestran y de su IP, así que se calcula al armar la figura (solo si
+# no viene del paquete estático).
+# Geometría del área de trazado: la figura se fija a este tamaño (márgenes fijos, sin
+# autoajuste al ancho de la columna) para que la disposición calculada sea la que se dibuja
+X_RANGE = (0.5, 3.5)
+Y_RANGE = (0, 30)
+PLOT_WIDTH_PX = 640
+PLOT_HEIGHT_PX = 560
+# Caben título, ticks de dos líneas y títulos de ejes; a la derecha, los rótulos de las zonas
+PLOT_MARGIN = dict(l=70, r=170, t=60, b=80)
+LEGEND_XY = (0.01, 0.99)
 
-# --- Título y Header ---
-st.title("🌍 Tabla Periódica del Científico de la Tierra")
-st.markdown("""
-Esta herramienta interactiva visualiza el comportamiento geoquímico de los iones basándose en su **Potencial Iónico** ($z/r$).
-Los elementos se clasifican según su afinidad electrónica y dureza química (Teoría HSAB).
-""")
-
-# --- Sidebar / Filtros ---
-st.sidebar.header("Configuración")
-grupos_seleccionados = st.sidebar.multiselect(
-    "Filtrar por Grupo:",
-    options=df['Grupo'].unique(),
-    default=df['Grupo'].unique()
-)
-
-df_filtered = df[df['Grupo'].isin(grupos_seleccionados)]
+# Zonas de fondo por IP: (y0, y1, color, rótulo). Los rótulos van en el margen derecho, fuera
+# del área de trazado, para no competir con las etiquetas de los iones ni con la leyenda
+ZONES = [
+    (10, 45, "rgba(200, 230, 255, 0.3)", "Formación de<br>Aniones Solubles<br>(CO3, SO4)"), # IP > 10
+    (3, 10, "rgba(255, 240, 200, 0.3)", "Hidrolizados /<br>Precipitados<br>(Suelos)"), # 3 < IP < 10
+    (0, 3, "rgba(200, 255, 200, 0.3)", "Cationes Solubles<br>(Agua de Mar)"), # IP < 3
+]
 
-# --- Visualización Principal ---
-col_grafico, col_info = st.columns([3, 1])
+@st.cache_data
+def table_layout(x_base, ip, symbols, legend):
+    # Una vez por dataset + filtro + coordinación (argumentos en tuplas: hash barato).
+    # La leyenda está dentro del área de trazado: su caja cuenta como ocupada
+    legend = label_layout.legend_box(legend, PLOT_WIDTH_PX, PLOT_HEIGHT_PX, *LEGEND_XY)
+    layout = label_layout.layout_labels(x_base, ip, symbols, X_RANGE, Y_RANGE,
+                                        width=PLOT_WIDTH_PX, height=PLOT_HEIGHT_PX, marker_size=25,
+                                        max_shift=0.45, obstacles=[legend]) # Sin salir de la franja de su columna
+    return layout.x, layout.textposition
 
-with col_grafico:
+# --- Gráfico Principal (determinista dado el filtro: se puede precalcular en el paquete estático) ---
+def build_table_figure(df_filtered):
+    x_final, text_pos = table_layout(tuple(df_filtered['X_Base']), tuple(df_filtered['Potencial_Ionico']),
+                                     tuple(df_filtered['Simbolo']), tuple(df_filtered['Grupo'].unique()))
+    df_filtered = df_filtered.assign(X_Final=x_final, Text_Pos=text_pos)
     fig = go.Figure()
 
     # == ZONIFICACIÓN DE FONDO (Rectángulos) ==
-    # Zona Alta: Formación de Aniones Solubles (IP > 10)
-    fig.add_hrect(
-        y0=10, y1=45, 
-        fillcolor="rgba(200, 230, 255, 0.3)", layer="below", line_width=0,
-        annotation_text="Formación de Aniones Solubles (CO3, SO4)", annotation_position="top left"
-    )
-    
-    # Zona Media: Hidrolizados / Insolubles (3 < IP < 10)
-    fig.add_hrect(
-        y0=3, y1=10, 
-        fillcolor="rgba(255, 240, 200, 0.3)", layer="below", line_width=0,
-        annotation_text="Hidrolizados / Precipitados (Suelos)", annotation_position="left"
-    )
-    
-    # Zona Baja: Cationes Solubles (IP < 3)
-    fig.add_hrect(
-        y0=0, y1=3, 
-        fillcolor="rgba(200, 255, 200, 0.3)", layer="below", line_width=0,
-        annotation_text="Cationes Solubles (Agua de Mar)", annotation_position="bottom left"
-    )
+    for y0, y1, color, caption in ZONES:
+        fig.add_hrect(y0=y0, y1=y1, fillcolor=color, layer="below", line_width=0)
+        # Rótulo en el margen derecho, centrado en la parte visible de la zona
+        fig.add_annotation(
+            text=caption, xref="paper", x=1, xshift=8, xanchor="left",
+            yref="y", y=(max(y0, Y_RANGE[0]) + min(y1, Y_RANGE[1])) / 2, yanchor="middle",
+            align="left", showarrow=False, font=dict(size=11)
+        )
 
     # == PUNTOS DE DATOS ==
     # Colores por grupo
@@ -145,7 +147,7 @@ with col_grafico:
             mode='markers+text',
             name=grupo,
             text=df_g['Simbolo'],
-            textposition="top center",
+            textposition=df_g['Text_Pos'].tolist(),
             marker=dict(
                 size=25,
                 symbol='square',
@@ -170,26 +172,67 @@ with col_grafico:
             tickmode='array',
             tickvals=[1, 2, 3],
             ticktext=["<b>Cationes Duros</b><br>(Litófilos)", "<b>Intermedios</b><br>(Transición)", "<b>Cationes Blandos</b><br>(Calcófilos)"],
-            range=[0.5, 3.5],
-            showgrid=False
+            range=list(X_RANGE),
+            showgrid=False,
+            automargin=False
         ),
         yaxis=dict(
             title="Potencial Iónico (z/r)",
-            range=[0, 30], # Ajustado para visualización, aniones como C4+ estarán arriba
-            showgrid=True
+            range=list(Y_RANGE), # Ajustado para visualización, aniones como C4+ estarán arriba
+            showgrid=True,
+            automargin=False
         ),
-        height=700,
+        width=PLOT_WIDTH_PX + PLOT_MARGIN["l"] + PLOT_MARGIN["r"],
+        height=PLOT_HEIGHT_PX + PLOT_MARGIN["t"] + PLOT_MARGIN["b"],
         legend=dict(
             yanchor="top",
-            y=0.99,
+            y=LEGEND_XY[1],
             xanchor="left",
-            x=0.01,
+            x=LEGEND_XY[0],
             bgcolor="rgba(255, 255, 255, 0.8)"
         ),
-        margin=dict(l=40, r=40, t=60, b=40),
+        margin=PLOT_MARGIN,
     )
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+# --- Título y Header ---
+st.title("🌍 Tabla Periódica del Científico de la Tierra")
+st.markdown("""
+Esta herramienta interactiva visualiza el comportamiento geoquímico de los iones basándose en su **Potencial Iónico** ($z/r$).
+Los elementos se clasifican según su afinidad electrónica y dureza química (Teoría HSAB).
+""")
+
+# --- Sidebar / Filtros ---
+st.sidebar.header("Configuración")
+grupos_seleccionados = st.sidebar.multiselect(
+    "Filtrar por Grupo:",
+    options=df['Grupo'].unique(),
+    default=df['Grupo'].unique()
+)
+
+coordinacion = COORDINATION_OPTIONS[st.sidebar.selectbox(
+    "Coordinación (radios de Shannon):",
+    options=list(COORDINATION_OPTIONS),
+    help="Si un ion no tiene datos para esa coordinación se usa su coordinación por defecto."
+)]
+
+# Radio e IP desde la tabla de radios (búsqueda vectorizada, sin recalcular IP)
+radii = lookup_radii(df['Simbolo'].tolist(), coordination=coordinacion)
+df['Radio'] = radii['radius']
+df['Potencial_Ionico'] = radii['ip']
+df['Coordinacion'] = radii['coordination']
+
+df_filtered = df[df['Grupo'].isin(grupos_seleccionados)]
+
+# --- Visualización Principal ---
+col_grafico, col_info = st.columns([3, 1])
+
+with col_grafico:
+    fig = static_bundle.load_figure("tabla", static_bundle.tabla_params(grupos_seleccionados, coordinacion))
+    if fig is None:
+        fig = build_table_figure(df_filtered)
+    st.plotly_chart(fig, use_container_width=False) # Tamaño fijo: es el que asume table_layout
 
 # --- Panel Didáctico ---
 with col_info:
@@ -225,11 +268,12 @@ st.markdown("### 📊 Datos Crudos")
 column_config = {
     "Simbolo": "Ion",
     "Potencial_Ionico": st.column_config.NumberColumn("Potencial Iónico", format="%.2f"),
-    "Radio": st.column_config.NumberColumn("Radio (Å)", format="%.2f"),
+    "Radio": st.column_config.NumberColumn("Radio (Å)", format="%.3f"),
+    "Coordinacion": st.column_config.NumberColumn("Coord."),
 }
 
 st.dataframe(
-    df_filtered[['Simbolo', 'Nombre', 'Grupo', 'Carga', 'Radio', 'Potencial_Ionico', 'Nota']],
+    df_filtered[['Simbolo', 'Nombre', 'Grupo', 'Carga', 'Radio', 'Coordinacion', 'Potencial_Ionico', 'Nota']],
     use_container_width=True,
     column_config=column_config,
     hide_index=True
@@ -1,8 +1,13 @@
 import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
-import pandas as pd
-import math
+import uuid
+
+import session_budget
+import static_bundle
+from geodata_core import COORDINATION_OPTIONS
+from physics_engine import PhysicsWorld, Trajectory, create_scenario, save_checkpoint
+from simulation_worker import SimulationJob
 
 # --- Configuración de la Página ---
 st.set_page_config(
@@ -12,168 +17,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# --- Motor de Física (Physics Engine) ---
-
-class Particle:
-    def __init__(self, id, x, y, type_name, charge, radius, mass, is_hard):
-        self.id = id
-        self.x = x
-        self.y = y
-        self.vx = 0
-        self.vy = 0
-        self.type_name = type_name
-        self.charge = charge
-        self.radius = radius # Visual radius mainly, acts as collision boundary
-        self.mass = mass
-        self.is_hard = is_hard # True for Hard (Ionic), False for Soft (Covalent/Polarizable)
-
-    def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-
-class PhysicsWorld:
-    def __init__(self, width=20, height=20):
-        self.width = width
-        self.height = height
-        self.particles = []
-        self.k_coulomb = 100.0 # Fuerza electrostática constante
-        self.k_repulsion = 200.0 # Fuerza de repulsión de Pauli (evitar colapso)
-        self.k_attraction_soft = 150.0 # "Pegamento" covalente para blandos
-        self.damping = 0.90 # Fricción para estabilizar el sistema (energía disipada)
-
-    def add_particle(self, p):
-        self.particles.append(p)
-
-    def step(self, dt):
-        # 1. Calcular Fuerzas
-        forces = {p.id: [0.0, 0.0] for p in self.particles}
-        
-        for i, p1 in enumerate(self.particles):
-            for j, p2 in enumerate(self.particles):
-                if i >= j: continue # Evitar doble conteo y auto-interacción
-
-                dx = p2.x - p1.x
-                dy = p2.y - p1.y
-                dist_sq = dx*dx + dy*dy
-                dist = math.sqrt(dist_sq)
-
-                if dist < 0.1: dist = 0.1 # Evitar división por cero
-
-                ux = dx / dist
-                uy = dy / dist
-
-                fx, fy = 0.0, 0.0
-
-                # A. Fuerza de Coulomb (q1 * q2 / r^2)
-                # Cargas opuestas se atraen (-), iguales se repelen (+)
-                f_coulomb = -(self.k_coulomb * p1.charge * p2.charge) / dist_sq
-                
-                # B. Repulsión de Corto Alcance (Pauli) ~ 1/r^12 simplificado a 1/r^6 para simulación visual
-                # Solo actúa si están muy cerca (tocándose)
-                contact_dist = (p1.radius + p2.radius) * 0.8 # Un poco de solape permitido
-                if dist < contact_dist:
-                    f_repulsion = self.k_repulsion / (dist**4)
-                    fx += f_repulsion * -ux # Empuja lejos
-                    fy += f_repulsion * -uy
-
-                # C. Atracción Específica "HSAB" (Simulación de covalencia/polarización)
-                # Si ambos son BLANDOS y de carga OPUESTA, atracción extra (enlaces covalentes fuertes)
-                if not p1.is_hard and not p2.is_hard and (p1.charge * p2.charge < 0):
-                    # Potencial tipo Lennard-Jones atractivo simplificado
-                    if dist > contact_dist and dist < contact_dist * 3:
-                         f_soft = self.k_attraction_soft / (dist**2)
-                         fx += f_soft * ux
-                         fy += f_soft * uy
-
-                # Sumar Coulomb
-                fx += f_coulomb * ux
-                fy += f_coulomb * uy
-
-                # Aplicar fuerzas (Acción/Reacción)
-                forces[p1.id][0] += -fx
-                forces[p1.id][1] += -fy
-                forces[p2.id][0] += fx
-                forces[p2.id][1] += fy
-
-        # 2. Integrar Movimiento (Euler con Amortiguación)
-        for p in self.particles:
-            fx, fy = forces[p.id]
-            ax = fx / p.mass
-            ay = fy / p.mass
-
-            p.vx = (p.vx + ax * dt) * self.damping
-            p.vy = (p.vy + ay * dt) * self.damping
-
-            # Paredes (Rebote simple)
-            if p.x < 0: p.x = 0; p.vx *= -1
-            if p.x > self.width: p.x = self.width; p.vx *= -1
-            if p.y < 0: p.y = 0; p.vy *= -1
-            if p.y > self.height: p.y = self.height; p.vy *= -1
-
-            p.update(dt)
-
-# --- Funciones Auxiliares UI ---
-
-def create_scenario(scenario_type):
-    world = PhysicsWorld(width=15, height=15)
-    
-    if scenario_type == "A": # Fertilidad (Ca + CO3) - Ordenado
-        # Grid inicial aleatorio
-        for i in range(8):
-            # Cationes Ca2+ (Duros)
-            world.add_particle(Particle(
-                id=f"Ca_{i}", 
-                x=np.random.uniform(2, 13), y=np.random.uniform(2, 13),
-                type_name="Ca²⁺", charge=2, radius=0.6, mass=40, is_hard=True
-            ))
-            # Aniones CO3-- (Duros)
-            world.add_particle(Particle(
-                id=f"CO3_{i}", 
-                x=np.random.uniform(2, 13), y=np.random.uniform(2, 13),
-                type_name="CO₃²⁻", charge=-2, radius=0.7, mass=60, is_hard=True
-            ))
-            
-    elif scenario_type == "B": # Contaminación (Hg + S) - Clumping
-        for i in range(8):
-            # Cationes Hg2+ (Blandos)
-            world.add_particle(Particle(
-                id=f"Hg_{i}", 
-                x=np.random.uniform(2, 13), y=np.random.uniform(2, 13),
-                type_name="Hg²⁺", charge=2, radius=0.8, mass=200, is_hard=False
-            ))
-            # Aniones S2- (Blandos)
-            world.add_particle(Particle(
-                id=f"S_{i}", 
-                x=np.random.uniform(2, 13), y=np.random.uniform(2, 13),
-                type_name="S²⁻", charge=-2, radius=0.9, mass=32, is_hard=False
-            ))
-
-    elif scenario_type == "C": # Competencia (Arcilla vs K vs Pb)
-        # Suelo Arcilloso (Aniones fijos en el fondo)
-        for i in range(6):
-            p = Particle(id=f"Clay_{i}", x=2.5 + i*2, y=2, type_name="Arcilla⁻", charge=-1, radius=1.0, mass=1000, is_hard=True) # Muy pesada = Fija
-            world.add_particle(p)
-        
-        # Invasores K+ (Duro, ligero) y Pb2+ (Blando, pesado)
-        for i in range(4):
-            world.add_particle(Particle(id=f"K_{i}", x=np.random.uniform(2, 13), y=np.random.uniform(5, 13), type_name="K⁺", charge=1, radius=0.7, mass=39, is_hard=True))
-            world.add_particle(Particle(id=f"Pb_{i}", x=np.random.uniform(2, 13), y=np.random.uniform(5, 13), type_name="Pb²⁺", charge=2, radius=0.9, mass=207, is_hard=False))
-
-    return world
-
-def run_simulation(world, frames=60, dt=0.05):
-    history = []
-    for _ in range(frames):
-        world.step(dt)
-        frame_data = []
-        for p in world.particles:
-            frame_data.append({
-                "id": p.id, "x": p.x, "y": p.y, "type": p.type_name, 
-                "radius": p.radius, "is_hard": p.is_hard, "charge": p.charge
-            })
-        history.append(frame_data)
-    return history
-
 # --- Interfaz de Usuario ---
 st.title("🧪 Atomic Soil Lab")
 st.markdown("Experimenta con la química del suelo a nivel atómico. **Teoría HSAB** (Ácidos y Bases Duros y Blandos).")
@@ -193,21 +36,158 @@ scenario_code = "A"
 if "Escenario B" in scenario_choice: scenario_code = "B"
 if "Escenario C" in scenario_choice: scenario_code = "C"
 
+compact_mode = st.sidebar.toggle(
+    "Modo compacto (float32)",
+    help="Calcula y guarda las trayectorias en precisión simple: la mitad de memoria por sesión. "
+         "Mismo comportamiento cualitativo, pero no la misma trayectoria exacta (ver `precision_report`)."
+)
+sim_dtype = np.float32 if compact_mode else None
+
+sim_coordination = COORDINATION_OPTIONS[st.sidebar.selectbox(
+    "Coordinación de los iones:",
+    options=list(COORDINATION_OPTIONS),
+    help="Escala el radio de contacto de cada ion con su radio de Shannon en esa coordinación."
+)]
+
 # Estado de la sesión para mantener la simulación
-if 'simulation_data' not in st.session_state or st.session_state.current_scenario != scenario_code:
+# La simulación corre en un hilo (SimulationJob); la página solo consulta su progreso.
+# Con la semilla por defecto la trayectoria es determinista y se sirve del paquete estático
+# (tools/build_bundle.py) si existe; "Reiniciar" usa una semilla nueva y calcula en vivo.
+# "Continuar" reanuda el mundo desde el checkpoint del último frame (trayectoria actual + job nuevo).
+# La trayectoria vive en session_budget (no en session_state): si el servidor la desaloja por
+# memoria mientras la pestaña está inactiva, se recarga del paquete o se recalcula al volver.
+SIM_FRAMES = 80
+SIM_DT = 0.05
+LAB_SEED = static_bundle.LAB_SEED
+EXTEND_FRAMES = 40
+
+if 'budget_session' not in st.session_state:
+    st.session_state.budget_session = uuid.uuid4().hex
+session_budget.store.touch(st.session_state.budget_session)
+
+def trajectory():
+    # Trayectoria de la sesión (None si aún se calcula o si fue desalojada)
+    return session_budget.store.get(st.session_state.budget_session, "simulation_data")
+
+def store_trajectory(traj):
+    session_id = st.session_state.budget_session
+    if traj is None:
+        session_budget.store.discard(session_id, "simulation_data")
+    else:
+        session_budget.store.put(session_id, "simulation_data", traj, traj.nbytes)
+
+def start_simulation(sim_params, extra_frames=0):
+    previous = st.session_state.get('sim_job')
+    if previous is not None:
+        previous.cancel() # Cancelar corridas obsoletas (cambio de escenario, precisión o reinicio)
+    st.session_state.sim_key = sim_params
+    st.session_state.sim_job = None
+    st.session_state.sim_extending = False
+    st.session_state.sim_error = None
+    st.session_state.sim_extra_frames = extra_frames # Frames de "Continuar": para recalcular tras un desalojo
+    store_trajectory(None)
+    scenario_code, frames, dt, dtype, seed, coordination = sim_params
+
+    bundled = static_bundle.load_arrays("lab", static_bundle.lab_params(sim_params))
+    if bundled is not None:
+        traj = Trajectory.from_arrays(bundled)
+        if not extra_frames or traj.checkpoint is not None:
+            store_trajectory(traj)
+            if extra_frames:
+                extend_simulation(extra_frames)
+            return
+
+    # Reanudar desde un checkpoint es bit a bit igual que correr todo de una vez
+    world = create_scenario(scenario_code, dtype=dtype, seed=seed, coordination=coordination)
+    st.session_state.sim_job = SimulationJob(
+        sim_params, world, frames=frames + extra_frames, dt=dt, snapshot=PhysicsWorld.positions
+    ).start()
+
+def restore_simulation():
+    # Misma corrida (parámetros + frames extendidos) tras un desalojo por memoria
+    start_simulation(st.session_state.sim_key, st.session_state.sim_extra_frames)
+
+def extend_simulation(frames):
+    # Continuar la trayectoria actual desde su checkpoint; sigue guardada como base del job
+    world = PhysicsWorld.from_checkpoint(trajectory().checkpoint)
+    st.session_state.sim_extending = True
+    st.session_state.sim_error = None
+    st.session_state.sim_job = SimulationJob(
+        st.session_state.sim_key, world, frames=frames, dt=SIM_DT, snapshot=PhysicsWorld.positions
+    ).start()
+
+def job_trajectory(job):
+    # Trajectory con los frames producidos hasta ahora por el worker (tras la base si se continúa)
+    world = job.world
+    checkpoint = world.checkpoint() if job.done and not job.cancelled else None
+    traj = Trajectory(world, list(job.frames), dtype=world.dtype or np.float64, checkpoint=checkpoint)
+    base = trajectory() if st.session_state.sim_extending else None
+    return traj if base is None else base.extend(traj)
+
+def collect_job():
+    # Guardar la trayectoria completa en cuanto el worker termina y soltar el job (y sus frames)
+    job = st.session_state.sim_job
+    if job is None or not job.done:
+        return
+    if job.error is not None:
+        # Soltar el job fallido y mostrar el error (si quedara en la sesión se relanzaría en cada
+        # rerun); no se reintenta solo: hace falta "Reiniciar" u otros parámetros
+        st.session_state.sim_error = f"{type(job.error).__name__}: {job.error}"
+        if st.session_state.sim_extending:
+            st.session_state.sim_extra_frames -= job.total # La base sigue siendo válida
+        st.session_state.sim_job = None
+        st.session_state.sim_extending = False
+        return
+    if st.session_state.sim_extending and trajectory() is None:
+        restore_simulation() # La base se desalojó mientras se extendía
+        return
+    store_trajectory(job_trajectory(job))
+    st.session_state.sim_job = None
+    st.session_state.sim_extending = False
+
+def ensure_simulation():
+    # Trayectoria lista (None si hay un job en marcha); si fue desalojada, recargar o recalcular
+    collect_job()
+    traj = trajectory()
+    if traj is None and st.session_state.sim_job is None and not st.session_state.get('sim_error'):
+        restore_simulation()
+        traj = trajectory()
+    return traj
+
+if st.session_state.get('current_scenario') != scenario_code:
     st.session_state.current_scenario = scenario_code
-    # Generar simulación inicial (pre-calculada)
-    world = create_scenario(scenario_code)
-    st.session_state.simulation_data = run_simulation(world, frames=80, dt=0.05) # 80 frames
-    st.session_state.world_initial = create_scenario(scenario_code) # Para info estática
+    st.session_state.lab_seed = LAB_SEED
 
 if st.sidebar.button("🔄 Reiniciar Simulación"):
-    world = create_scenario(scenario_code)
-    st.session_state.simulation_data = run_simulation(world, frames=80, dt=0.05)
-    st.rerun()
+    st.session_state.lab_seed = int(np.random.default_rng().integers(2**32))
+
+sim_params = (scenario_code, SIM_FRAMES, SIM_DT, sim_dtype, st.session_state.lab_seed, sim_coordination)
+if st.session_state.get('sim_key') != sim_params:
+    start_simulation(sim_params)
+traj = ensure_simulation()
+
+can_extend = st.session_state.sim_job is None and traj is not None and traj.checkpoint is not None
+if st.sidebar.button(f"⏩ Continuar +{EXTEND_FRAMES} frames", disabled=not can_extend,
+                     help="Reanuda el mundo desde el último frame (posiciones, velocidades y RNG) en vez de empezar de nuevo."):
+    st.session_state.sim_extra_frames += EXTEND_FRAMES
+    extend_simulation(EXTEND_FRAMES)
+
+if st.session_state.sim_job is None and traj is not None and traj.checkpoint is not None:
+    st.sidebar.download_button(
+        "💾 Descargar checkpoint", data=save_checkpoint(traj.checkpoint),
+        file_name=f"lab_{scenario_code}_{len(traj)}f.npz",
+        help="Estado completo del mundo; se reanuda con `PhysicsWorld.from_checkpoint(load_checkpoint(...))`."
+    )
+
+# Métricas de memoria: bytes de esta sesión y del servidor frente al presupuesto global
+budget = session_budget.store.stats()
+st.sidebar.caption(
+    f"🧠 Memoria de la sesión: {budget['sessions'].get(st.session_state.budget_session, {}).get('bytes', 0) / 1e6:.2f} MB · "
+    f"servidor: {budget['total_bytes'] / 1e6:.1f}/{budget['budget_bytes'] / 1e6:.0f} MB en {len(budget['sessions'])} sesiones, "
+    f"{budget['evictions']} desalojos"
+)
 
 # --- Construir Animación Plotly ---
-sim_data = st.session_state.simulation_data
 
 # Definir estilo por tipo de partículas (Colores y Tamaños)
 # Duros (Azules/Cyan), Blandos (Rojos/Gold), Aniones Duros (Verdes)
@@ -216,69 +196,89 @@ def get_color(type_name, is_hard, charge):
     if not is_hard: return "#d62728" # Blandos (Rojo)
     return "#1f77b4" # Duros (Azul)
 
-# Frame Base (Frame 0)
-initial_frame = sim_data[0]
-fig = go.Figure(
-    data=[
-        # Capa 1: Nubes Electrónicas (Grandes, transparentes)
-        go.Scatter(
-            x=[p['x'] for p in initial_frame],
-            y=[p['y'] for p in initial_frame],
-            mode='markers',
-            marker=dict(
-                size=[p['radius'] * 40 for p in initial_frame], # Escalar para visualización
-                color=[get_color(p['type'], p['is_hard'], p['charge']) for p in initial_frame],
-                opacity=0.3,
-                line=dict(width=0)
+def build_figure(traj):
+    # Frame Base (Frame 0)
+    labels = traj.labels
+    x0, y0 = traj.positions[0, :, 0], traj.positions[0, :, 1]
+    fig = go.Figure(
+        data=[
+            # Capa 1: Nubes Electrónicas (Grandes, transparentes)
+            go.Scatter(
+                x=x0,
+                y=y0,
+                mode='markers',
+                marker=dict(
+                    size=traj.radius * 40, # Escalar para visualización
+                    color=[get_color(t, h, q) for t, h, q in zip(labels, traj.is_hard, traj.charge)],
+                    opacity=0.3,
+                    line=dict(width=0)
+                ),
+                hoverinfo='skip'
             ),
-            hoverinfo='skip'
+            # Capa 2: Núcleos (Puntos sólidos)
+            go.Scatter(
+                x=x0,
+                y=y0,
+                mode='markers+text',
+                text=labels,
+                textposition="top center",
+                marker=dict(
+                    size=8,
+                    color='white',
+                    line=dict(width=1, color='black')
+                ),
+                hoverinfo='text'
+            )
+        ],
+        layout=go.Layout(
+            xaxis=dict(range=[0, 15], showgrid=False, zeroline=False, visible=False),
+            yaxis=dict(range=[0, 15], showgrid=False, zeroline=False, visible=False),
+            plot_bgcolor='#0e1117', # Fondo oscuro tipo Streamlit
+            paper_bgcolor='#0e1117',
+            height=600,
+            showlegend=False,
+            margin=dict(l=0, r=0, t=0, b=0),
+            updatemenus=[dict(
+                type="buttons",
+                buttons=[dict(label="▶️ Iniciar Reacción",
+                              method="animate",
+                              args=[None, {"frame": {"duration": 50, "redraw": True},
+                                           "fromcurrent": True, "transition": {"duration": 0}}])]
+            )]
         ),
-        # Capa 2: Núcleos (Puntos sólidos)
-        go.Scatter(
-            x=[p['x'] for p in initial_frame],
-            y=[p['y'] for p in initial_frame],
-            mode='markers+text',
-            text=[p['type'] for p in initial_frame],
-            textposition="top center",
-            marker=dict(
-                size=8,
-                color='white',
-                line=dict(width=1, color='black')
-            ),
-            hoverinfo='text'
-        )
-    ],
-    layout=go.Layout(
-        xaxis=dict(range=[0, 15], showgrid=False, zeroline=False, visible=False),
-        yaxis=dict(range=[0, 15], showgrid=False, zeroline=False, visible=False),
-        plot_bgcolor='#0e1117', # Fondo oscuro tipo Streamlit
-        paper_bgcolor='#0e1117',
-        height=600,
-        showlegend=False,
-        margin=dict(l=0, r=0, t=0, b=0),
-        updatemenus=[dict(
-            type="buttons",
-            buttons=[dict(label="▶️ Iniciar Reacción",
-                          method="animate",
-                          args=[None, {"frame": {"duration": 50, "redraw": True},
-                                       "fromcurrent": True, "transition": {"duration": 0}}])]
-        )]
-    ),
-    frames=[
-        go.Frame(
-            data=[
-                go.Scatter(x=[p['x'] for p in f], y=[p['y'] for p in f]), # Update nubes
-                go.Scatter(x=[p['x'] for p in f], y=[p['y'] for p in f], text=[p['type'] for p in f])  # Update núcleos
-            ]
-        ) for f in sim_data
-    ]
-)
+        frames=[
+            go.Frame(
+                data=[
+                    go.Scatter(x=xy[:, 0], y=xy[:, 1]), # Update nubes
+                    go.Scatter(x=xy[:, 0], y=xy[:, 1], text=labels)  # Update núcleos
+                ]
+            ) for xy in traj.positions
+        ]
+    )
+    return fig
 
 # Layout de dos columnas
 col_main, col_info = st.columns([3, 1])
 
+# Vista previa progresiva: se refresca sola mientras el worker produce frames
+@st.fragment(run_every=0.3)
+def live_preview():
+    job = st.session_state.sim_job
+    if job is None or job.done:
+        st.rerun() # Corrida terminada: redibujar la página con la animación completa
+    traj = job_trajectory(job)
+    st.progress(job.progress, text=f"Calculando trayectorias... {len(job.frames)}/{job.total} frames")
+    if len(traj):
+        st.plotly_chart(build_figure(traj), use_container_width=True)
+
 with col_main:
-    st.plotly_chart(fig, use_container_width=True)
+    traj = ensure_simulation()
+    if st.session_state.get('sim_error'):
+        st.error(f"La simulación falló ({st.session_state.sim_error}). Prueba con 🔄 Reiniciar Simulación u otros parámetros.")
+    if st.session_state.sim_job is not None:
+        live_preview()
+    elif traj is not None:
+        st.plotly_chart(build_figure(traj), use_container_width=True)
 
 with col_info:
     st.markdown("### 📝 Notas de Lab")
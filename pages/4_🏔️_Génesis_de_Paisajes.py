@@ -2,6 +2,9 @@ import streamlit as st
 import plotly.graph_objects as go
 import numpy as np
 
+import landscape_evolution
+import static_bundle
+
 # --- Configuración de la Página ---
 st.set_page_config(
     page_title="Génesis de Paisajes: El Gran Filtro",
@@ -63,36 +66,20 @@ with tab3:
 
 st.markdown("---")
 
-# --- Lógica de Visualización 3D Avanzada ---
-col_viz, col_ctrl = st.columns([0.7, 0.3])
-
-with col_ctrl:
-    st.subheader("🔬 Lente de Rayos X")
-    view_mode = st.radio(
-        "Filtra la realidad:",
-        ["Todo (Vista Real)", "Resistatos (Esqueleto)", "Solutos (El Mar/Sal)", "Hidrolizados (Suelo)"]
-    )
-    
-    st.markdown("### 💡 Insight")
-    if view_mode == "Todo (Vista Real)":
-        st.info("Ves el ciclo completo. Observa cómo la montaña (Marrón) 'pierde' masa que termina en el mar.")
-    elif view_mode == "Resistatos (Esqueleto)":
-        st.warning("**Cuarzo ($Si^{4+}$)**\n\nEl esqueleto de la Tierra. El enlace Si-O es tan fuerte ($z/r$ extremo) que sobrevive al viaje físico y químico, acumulándose en la costa.")
-    elif view_mode == "Solutos (El Mar/Sal)":
-        st.success("**Sodio y Calcio ($Na^+, Ca^{2+}$)**\n\nEl sabor del mar. Estos iones fueron lavados de las montañas durante eones debido a su bajo Potencial Iónico ($z/r$ bajo).")
-    elif view_mode == "Hidrolizados (Suelo)":
-        st.error("**Arcillas ($Al^{3+}$)**\n\nEl Aluminio se hidroliza. No es soluble pero tampoco inerte. Se queda en la ladera formando el suelo fértil (Pedogénesis).")
+# --- Escena 3D (determinista dada la semilla: se puede precalcular en el paquete estático) ---
+GENESIS_SEED = static_bundle.GENESIS_SEED
 
-with col_viz:
+def build_landscape_figure(view_mode, seed=GENESIS_SEED, evolution=None):
+    # Con `evolution` (modo animado) el terreno y las partículas salen de su estado actual
+    rng = np.random.default_rng(seed)
     # 1. Generación de Terreno
-    x = np.linspace(-10, 10, 50) # -10 a 0 = Montaña, 0 a 10 = Mar
-    y = np.linspace(-5, 5, 25)
-    X, Y = np.meshgrid(x, y)
-    
     # Función de Altura (Sigmoide modificada)
     # Si x < 0: Montaña alta que baja. Si x > 0: Fondo marino profundo.
-    Z_terrain = -5 * np.tanh(X/4) # Genera una pendiente suave de +5 a -5
-    Z_terrain += 0.5 * np.sin(Y) * np.exp(-(X)**2 / 10) # Añadir "valles" en la montaña
+    if evolution is None:
+        X, Y, Z_terrain = landscape_evolution.initial_terrain()
+    else:
+        X, Y, Z_terrain = evolution.X, evolution.Y, evolution.Z.copy()
+        particles = evolution.particles()
     
     # Plano del Agua (Z=0 para X>0)
     Z_water = np.zeros_like(Z_terrain)
@@ -126,9 +113,12 @@ with col_viz:
     # A. Cuarzo (Arena) - En la costa (X ~ 0)
     if view_mode in ["Todo (Vista Real)", "Resistatos (Esqueleto)"]:
         # Acumulación en la "playa" (X entre -1 y 1)
-        x_q = np.random.normal(0, 1.5, 100)
-        y_q = np.random.uniform(-5, 5, 100)
-        z_q = -5 * np.tanh(x_q/4) + 0.3 # Encima del terreno
+        if evolution is None:
+            x_q = rng.normal(0, 1.5, 100)
+            y_q = rng.uniform(-5, 5, 100)
+            z_q = -5 * np.tanh(x_q/4) + 0.3 # Encima del terreno
+        else:
+            x_q, y_q, z_q = particles["quartz"]
         
         fig.add_trace(go.Scatter3d(
             x=x_q, y=y_q, z=z_q,
@@ -140,9 +130,12 @@ with col_viz:
 
     # B. Arcillas (Suelo) - En la montaña (X < -2)
     if view_mode in ["Todo (Vista Real)", "Hidrolizados (Suelo)"]:
-        x_c = np.random.uniform(-9, -2, 100)
-        y_c = np.random.uniform(-5, 5, 100)
-        z_c = -5 * np.tanh(x_c/4) + 0.3
+        if evolution is None:
+            x_c = rng.uniform(-9, -2, 100)
+            y_c = rng.uniform(-5, 5, 100)
+            z_c = -5 * np.tanh(x_c/4) + 0.3
+        else:
+            x_c, y_c, z_c = particles["clay"]
         
         fig.add_trace(go.Scatter3d(
             x=x_c, y=y_c, z=z_c,
@@ -154,9 +147,12 @@ with col_viz:
 
     # C. Solutos (Iones) - En el mar (X > 1)
     if view_mode in ["Todo (Vista Real)", "Solutos (El Mar/Sal)"]:
-        x_s = np.random.uniform(2, 9, 150)
-        y_s = np.random.uniform(-5, 5, 150)
-        z_s = np.random.uniform(-4, -0.5, 150) # Debajo del agua
+        if evolution is None:
+            x_s = rng.uniform(2, 9, 150)
+            y_s = rng.uniform(-5, 5, 150)
+            z_s = rng.uniform(-4, -0.5, 150) # Debajo del agua
+        else:
+            x_s, y_s, z_s = particles["solutes"]
         
         fig.add_trace(go.Scatter3d(
             x=x_s, y=y_s, z=z_s,
@@ -185,8 +181,63 @@ with col_viz:
         height=600,
         paper_bgcolor='#0e1117',
     )
+
+    return fig
+
+# Nombre de traza -> grupo de partículas de la evolución
+ANIMATED_TRACES = {"Cuarzo (SiO₂)": "quartz", "Arcillas (Al)": "clay", "Iones (Na, Ca)": "solutes"}
+
+# Cada entrada son los argumentos de un render, de hasta ~3 MB (4 lentes x 20 valores de pasos
+# posibles): se acota la caché para que no crezca durante toda la vida del servidor
+@st.cache_data(show_spinner="Erosionando la montaña...", max_entries=8, ttl="1h")
+def build_landscape_animation(view_mode, steps, seed=GENESIS_SEED):
+    # Los frames se calculan de forma perezosa y viajan como deltas cuantizados (ver landscape_evolution)
+    evolution = landscape_evolution.LandscapeEvolution(seed)
+    fig = build_landscape_figure(view_mode, seed, evolution=evolution)
+    traces = {"terrain": 0, "particles": {ANIMATED_TRACES[t.name]: i for i, t in enumerate(fig.data) if t.name in ANIMATED_TRACES}}
+    payload = landscape_evolution.encode_evolution(evolution, steps)
+    args = landscape_evolution.player_args(fig, payload, traces, height=fig.layout.height,
+                                           version=f"{view_mode}|{steps}|{seed}")
+    return args, landscape_evolution.payload_stats(args)
+
+# --- Lógica de Visualización 3D Avanzada ---
+col_viz, col_ctrl = st.columns([0.7, 0.3])
+
+with col_ctrl:
+    st.subheader("🔬 Lente de Rayos X")
+    view_mode = st.radio(
+        "Filtra la realidad:",
+        ["Todo (Vista Real)", "Resistatos (Esqueleto)", "Solutos (El Mar/Sal)", "Hidrolizados (Suelo)"]
+    )
     
-    st.plotly_chart(fig, use_container_width=True)
+    st.markdown("### 💡 Insight")
+    if view_mode == "Todo (Vista Real)":
+        st.info("Ves el ciclo completo. Observa cómo la montaña (Marrón) 'pierde' masa que termina en el mar.")
+    elif view_mode == "Resistatos (Esqueleto)":
+        st.warning("**Cuarzo ($Si^{4+}$)**\n\nEl esqueleto de la Tierra. El enlace Si-O es tan fuerte ($z/r$ extremo) que sobrevive al viaje físico y químico, acumulándose en la costa.")
+    elif view_mode == "Solutos (El Mar/Sal)":
+        st.success("**Sodio y Calcio ($Na^+, Ca^{2+}$)**\n\nEl sabor del mar. Estos iones fueron lavados de las montañas durante eones debido a su bajo Potencial Iónico ($z/r$ bajo).")
+    elif view_mode == "Hidrolizados (Suelo)":
+        st.error("**Arcillas ($Al^{3+}$)**\n\nEl Aluminio se hidroliza. No es soluble pero tampoco inerte. Se queda en la ladera formando el suelo fértil (Pedogénesis).")
+
+    st.markdown("### ⏳ Tiempo Geológico")
+    animated = st.toggle("🎞️ Modo animado", value=False, help="Erosiona la montaña paso a paso. Los frames se envían como deltas compactos y se reproducen en el navegador.")
+    steps = st.slider("Pasos de tiempo:", 50, 1000, 300, step=50, disabled=not animated)
+
+with col_viz:
+    if animated:
+        player, stats = build_landscape_animation(view_mode, steps)
+        # Componente con plotly.js servido como archivo estático; con key el iframe no se recrea
+        landscape_evolution.player_component()(**player, key="landscape_player", default=None)
+        st.caption(f"{steps} frames: {stats['render_bytes'] / 1e6:.2f} MB por render (figura base + "
+                   f"{stats['delta_bytes'] / 1e6:.2f} MB de deltas; frames completos: ~{stats['full_bytes'] / 1e6:.1f} MB, "
+                   f"{stats['ratio']:.0f}× menos). Primera vista: {stats['view_bytes'] / 1e6:.1f} MB con plotly.js "
+                   f"({stats['plotlyjs_bytes'] / 1e6:.1f} MB, una vez por vista y cacheable).")
+    else:
+        fig = static_bundle.load_figure("genesis", static_bundle.genesis_params(view_mode))
+        if fig is None:
+            fig = build_landscape_figure(view_mode)
+        st.plotly_chart(fig, use_container_width=True)
 
 # --- Sección Curiosidades ---
 st.markdown("### 🌍 ¿Sabías qué?")
@@ -0,0 +1,587 @@
+# Motor de Física del Laboratorio Atómico
+# Partículas con carga, radio y blandura HSAB que interactúan por Coulomb, repulsión de Pauli
+# y atracción covalente entre blandos. Se importa una sola vez por proceso: lo usan la página
+# del laboratorio, el worker en segundo plano y los scripts de tools/ (builds, benchmarks, lotes).
+#
+# Uso fuera de Streamlit:
+#   from physics_engine import create_scenario, run_simulation
+#   traj = run_simulation(create_scenario("B", dtype=np.float32, seed=0), frames=200)
+
+import copy
+import io
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from geodata_core import HSAB_SOFTNESS, lookup_radii
+
+# Motor vectorizado: las fuerzas se evalúan por bloques de filas (partícula i contra todas las j)
+# de a lo sumo BLOCK_PAIRS pares, así la memoria temporal no crece como N x N. Con workers > 1
+# los bloques se reparten en un pool de hilos (NumPy libera el GIL en las operaciones grandes),
+# y se parten en al menos `workers` bloques para que todos los hilos tengan filas.
+# Ojo: el worker de simulación ya corre hasta ATLAS_MAX_SIM_JOBS corridas a la vez; subir los
+# hilos por corrida solo conviene para mundos grandes o pocas sesiones simultáneas.
+BLOCK_PAIRS = 1 << 18
+DEFAULT_WORKERS = max(1, int(os.environ.get("ATLAS_FORCE_WORKERS", "1")))
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _force_pool(workers):
+    # Un pool por número de hilos, compartido por todos los mundos del proceso
+    with _pools_lock:
+        if workers not in _pools:
+            _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"forces-{workers}")
+        return _pools[workers]
+
+
+class Particle:
+    def __init__(self, id, x, y, type_name, charge, radius, mass, is_hard, softness=None):
+        self.id = id
+        self.x = x
+        self.y = y
+        self.vx = 0
+        self.vy = 0
+        self.type_name = type_name
+        self.charge = charge
+        self.radius = radius # Visual radius mainly, acts as collision boundary
+        self.mass = mass
+        self.is_hard = is_hard # True for Hard (Ionic), False for Soft (Covalent/Polarizable)
+        # Blandura HSAB continua (0 = Duro, 1 = Blando); permite especies intermedias (p. ej. Fe3+)
+        self.softness = HSAB_SOFTNESS["Hard" if is_hard else "Soft"] if softness is None else softness
+
+    def update(self, dt):
+        self.x += self.vx * dt
+        self.y += self.vy * dt
+
+class InteractionTable:
+    # Parámetros por par de especies (matrices S x S), calculados una vez a partir de los
+    # datos de cada ion. El kernel de fuerzas solo indexa: no hay ramas por especie.
+    PARAMS = ("charge_product", "contact_dist", "soft_strength", "soft_cutoff")
+
+    def __init__(self, species, k_attraction_soft, rules=None):
+        # species: una partícula representativa por especie, en orden de código
+        self.names = [p.type_name for p in species]
+        q = np.array([p.charge for p in species], dtype=np.float64)
+        r = np.array([p.radius for p in species], dtype=np.float64)
+        s = np.array([p.softness for p in species], dtype=np.float64)
+
+        self.charge_product = np.outer(q, q)
+        self.contact_dist = (r[:, None] + r[None, :]) * 0.8 # Un poco de solape permitido
+        # Atracción covalente solo entre cargas OPUESTAS, escalada por la blandura de ambos
+        self.soft_strength = np.where(self.charge_product < 0, k_attraction_soft * np.outer(s, s), 0.0)
+        self.soft_cutoff = self.contact_dist * 3
+
+        # Reglas personalizadas por par (p. ej. afinidades específicas de un ligando)
+        index = {name: code for code, name in enumerate(self.names)}
+        for (a, b), overrides in (rules or {}).items():
+            if a not in index or b not in index:
+                continue
+            i, j = index[a], index[b]
+            for name, value in overrides.items():
+                matrix = getattr(self, name)
+                matrix[i, j] = matrix[j, i] = value
+
+        # Listas anidadas para el bucle de referencia (más rápidas que indexar NumPy escalar)
+        self.rows = {name: getattr(self, name).tolist() for name in self.PARAMS}
+
+    def matrices(self, dtype):
+        # Matrices S x S en el dtype del motor vectorizado; el kernel las expande por bloque
+        return {name: getattr(self, name).astype(dtype) for name in self.PARAMS}
+
+class PhysicsWorld:
+    CHECKPOINT_VERSION = 1
+    CONSTANTS = ("k_coulomb", "k_repulsion", "k_attraction_soft", "damping")
+
+    def __init__(self, width=20, height=20, dtype=None, seed=None, workers=None, block_pairs=BLOCK_PAIRS):
+        self.width = width
+        self.height = height
+        self.particles = []
+        self.workers = workers or DEFAULT_WORKERS # Hilos para las fuerzas del motor vectorizado
+        self.block_pairs = block_pairs # Pares por bloque: acota la memoria temporal por hilo
+        self.rng = np.random.default_rng(seed) # Fuente aleatoria del mundo (escenarios, perturbaciones)
+        self.steps = 0 # Pasos integrados desde el estado inicial
+        # dtype=None: motor de referencia (floats de Python, par a par)
+        # dtype=np.float32 / np.float64: motor vectorizado con arreglos NumPy de ese tipo
+        self.dtype = dtype
+        self._arrays = None
+        self._table = None
+        self.pair_rules = {}
+        self.k_coulomb = 100.0 # Fuerza electrostática constante
+        self.k_repulsion = 200.0 # Fuerza de repulsión de Pauli (evitar colapso)
+        self.k_attraction_soft = 150.0 # "Pegamento" covalente para blandos
+        self.damping = 0.90 # Fricción para estabilizar el sistema (energía disipada)
+
+    def add_particle(self, p):
+        self.particles.append(p)
+        self._arrays = None # Reempaquetar en el próximo paso vectorizado
+        self._table = None
+
+    def set_pair_rule(self, type_a, type_b, **overrides):
+        # Sobrescribe parámetros de un par de especies, p. ej. soft_strength=300.0
+        unknown = set(overrides) - set(InteractionTable.PARAMS)
+        if unknown:
+            raise ValueError(f"Parámetros de par desconocidos: {sorted(unknown)}")
+        self.pair_rules.setdefault((type_a, type_b), {}).update(overrides)
+        self._arrays = None
+        self._table = None
+
+    def interactions(self):
+        # (códigos de especie por partícula, tabla de interacción); se reconstruye solo si cambian
+        # las especies o las reglas. Las constantes k_* se leen al construirla.
+        if self._table is None:
+            codes, names = self.species_codes()
+            species = [self.particles[codes.index(code)] for code in range(len(names))]
+            self._table = (codes, InteractionTable(species, self.k_attraction_soft, self.pair_rules))
+        return self._table
+
+    def species_codes(self):
+        # Código entero por especie (en orden de aparición) + nombres de cada código
+        names = list(dict.fromkeys(p.type_name for p in self.particles))
+        index = {name: code for code, name in enumerate(names)}
+        return [index[p.type_name] for p in self.particles], names
+
+    def positions(self):
+        # Copia (N, 2) de las posiciones actuales, en el dtype de almacenamiento del mundo
+        if self._arrays is not None:
+            return self._arrays["pos"].copy()
+        return np.array([[p.x, p.y] for p in self.particles], dtype=self.dtype or np.float64)
+
+    def _pack(self):
+        ps = self.particles
+        codes, table = self.interactions()
+        self._arrays = {
+            "pos": np.array([[p.x, p.y] for p in ps], dtype=self.dtype),
+            "vel": np.array([[p.vx, p.vy] for p in ps], dtype=self.dtype),
+            "mass": np.array([p.mass for p in ps], dtype=self.dtype),
+            "codes": np.array(codes, dtype=np.intp),
+            **table.matrices(self.dtype),
+        }
+
+    def checkpoint(self):
+        """Estado completo del mundo como dict de arreglos (serializable con np.savez).
+
+        Incluye posiciones, velocidades, datos de cada partícula, constantes, reglas de par y el
+        estado del RNG: `PhysicsWorld.from_checkpoint` continúa exactamente donde quedó este mundo.
+        """
+        ps = self.particles
+        meta = {
+            "version": self.CHECKPOINT_VERSION,
+            "width": self.width, "height": self.height,
+            "dtype": None if self.dtype is None else np.dtype(self.dtype).name,
+            "steps": self.steps,
+            "constants": {name: getattr(self, name) for name in self.CONSTANTS},
+            "pair_rules": [[a, b, overrides] for (a, b), overrides in self.pair_rules.items()],
+            "rng": self.rng.bit_generator.state,
+        }
+        return {
+            "meta": np.array(json.dumps(meta)),
+            "ids": np.array([p.id for p in ps]),
+            "type_name": np.array([p.type_name for p in ps]),
+            "charge": np.array([p.charge for p in ps]),
+            "radius": np.array([p.radius for p in ps], dtype=np.float64),
+            "mass": np.array([p.mass for p in ps], dtype=np.float64),
+            "is_hard": np.array([p.is_hard for p in ps], dtype=bool),
+            "softness": np.array([p.softness for p in ps], dtype=np.float64),
+            # Estado dinámico en float64: exacto también para mundos float32
+            "state": np.array([[p.x, p.y, p.vx, p.vy] for p in ps], dtype=np.float64),
+        }
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint):
+        meta = json.loads(checkpoint["meta"].item())
+        if meta["version"] != cls.CHECKPOINT_VERSION:
+            raise ValueError(f"Versión de checkpoint no soportada: {meta['version']}")
+        dtype = None if meta["dtype"] is None else np.dtype(meta["dtype"]).type
+        world = cls(width=meta["width"], height=meta["height"], dtype=dtype)
+        world.steps = meta["steps"]
+        for name, value in meta["constants"].items():
+            setattr(world, name, value)
+        for a, b, overrides in meta["pair_rules"]:
+            world.set_pair_rule(a, b, **overrides)
+        world.rng.bit_generator.state = meta["rng"]
+
+        columns = zip(checkpoint["ids"].tolist(), checkpoint["type_name"].tolist(), checkpoint["charge"].tolist(),
+                      checkpoint["radius"].tolist(), checkpoint["mass"].tolist(), checkpoint["is_hard"].tolist(),
+                      checkpoint["softness"].tolist(), checkpoint["state"].tolist())
+        for id, type_name, charge, radius, mass, is_hard, softness, (x, y, vx, vy) in columns:
+            p = Particle(id, x, y, type_name, charge, radius, mass, is_hard, softness=softness)
+            p.vx, p.vy = vx, vy
+            world.add_particle(p)
+        return world
+
+    def step(self, dt):
+        self.steps += 1
+        if self.dtype is not None:
+            return self._step_arrays(dt)
+
+        # 1. Calcular Fuerzas
+        forces = self._loop_forces()
+
+        # 2. Integrar Movimiento (Euler con Amortiguación)
+        for p, (fx, fy) in zip(self.particles, forces):
+            ax = fx / p.mass
+            ay = fy / p.mass
+
+            p.vx = (p.vx + ax * dt) * self.damping
+            p.vy = (p.vy + ay * dt) * self.damping
+
+            # Paredes (Rebote simple)
+            if p.x < 0: p.x = 0; p.vx *= -1
+            if p.x > self.width: p.x = self.width; p.vx *= -1
+            if p.y < 0: p.y = 0; p.vy *= -1
+            if p.y > self.height: p.y = self.height; p.vy *= -1
+
+            p.update(dt)
+
+    def _loop_forces(self):
+        # Motor de referencia: par a par con floats de Python, [fx, fy] por partícula
+        forces = [[0.0, 0.0] for _ in self.particles]
+        codes, table = self.interactions()
+        charge_product, contact, soft_strength, soft_cutoff = (table.rows[n] for n in InteractionTable.PARAMS)
+        
+        for i, p1 in enumerate(self.particles):
+            for j, p2 in enumerate(self.particles):
+                if i >= j: continue # Evitar doble conteo y auto-interacción
+                si, sj = codes[i], codes[j]
+
+                dx = p2.x - p1.x
+                dy = p2.y - p1.y
+                dist_sq = dx*dx + dy*dy
+                dist = math.sqrt(dist_sq)
+
+                if dist < 0.1: dist = 0.1 # Evitar división por cero
+
+                ux = dx / dist
+                uy = dy / dist
+
+                fx, fy = 0.0, 0.0
+
+                # A. Fuerza de Coulomb (q1 * q2 / r^2)
+                # Cargas opuestas se atraen (-), iguales se repelen (+)
+                f_coulomb = -(self.k_coulomb * charge_product[si][sj]) / dist_sq
+                
+                # B. Repulsión de Corto Alcance (Pauli) ~ 1/r^12 simplificado a 1/r^6 para simulación visual
+                # Solo actúa si están muy cerca (tocándose)
+                contact_dist = contact[si][sj]
+                if dist < contact_dist:
+                    f_repulsion = self.k_repulsion / (dist**4)
+                    fx += f_repulsion * -ux # Empuja lejos
+                    fy += f_repulsion * -uy
+
+                # C. Atracción Específica "HSAB" (Simulación de covalencia/polarización)
+                # Blandos de carga OPUESTA: atracción extra (enlaces covalentes fuertes).
+                # La tabla ya vale 0 para los pares que no se atraen.
+                if contact_dist < dist < soft_cutoff[si][sj]:
+                    # Potencial tipo Lennard-Jones atractivo simplificado
+                    f_soft = soft_strength[si][sj] / (dist**2)
+                    fx += f_soft * ux
+                    fy += f_soft * uy
+
+                # Sumar Coulomb
+                fx += f_coulomb * ux
+                fy += f_coulomb * uy
+
+                # Aplicar fuerzas (Acción/Reacción)
+                forces[i][0] += -fx
+                forces[i][1] += -fy
+                forces[j][0] += fx
+                forces[j][1] += fy
+
+        return forces
+
+    def _block_forces(self, a, start, stop, forces):
+        # Fuerzas sobre las partículas start..stop-1 (filas) debidas a todas las demás (columnas)
+        pos = a["pos"]
+        rows = slice(start, stop)
+        diag = (np.arange(stop - start), np.arange(start, stop)) # Pares (i, i) del bloque
+        ix = np.ix_(a["codes"][rows], a["codes"])
+        contact_dist = a["contact_dist"][ix]
+
+        d = pos[None, :, :] - pos[rows, None, :] # d[i, j] = p_j - p_i
+        dist_sq = (d * d).sum(axis=-1)
+        dist_sq[diag] = 1.0 # Sin auto-interacción (se anula abajo)
+        dist = np.maximum(np.sqrt(dist_sq), 0.1) # Evitar división por cero
+
+        # Magnitud escalar a lo largo de u_ij: Coulomb + HSAB - Pauli
+        f = -(self.k_coulomb * a["charge_product"][ix]) / dist_sq
+        f -= np.where(dist < contact_dist, self.k_repulsion / dist**4, 0)
+        soft_zone = (dist > contact_dist) & (dist < a["soft_cutoff"][ix])
+        f += np.where(soft_zone, a["soft_strength"][ix] / dist**2, 0)
+        f[diag] = 0
+
+        # Fuerza sobre i: -sum_j f_ij * u_ij (acción/reacción). Cada bloque reduce sus
+        # propias filas completas: los hilos escriben en filas disjuntas de `forces`.
+        forces[rows] = -((f / dist)[:, :, None] * d).sum(axis=1)
+
+    def row_blocks(self):
+        # Bloques de filas (start, stop) del motor vectorizado: a lo sumo block_pairs pares cada
+        # uno y al menos `workers` bloques (si hay filas para todos)
+        n = len(self._arrays["pos"]) if self._arrays is not None else len(self.particles)
+        block = max(1, min(self.block_pairs // max(n, 1), -(-n // max(self.workers, 1))))
+        return [(start, min(start + block, n)) for start in range(0, n, block)]
+
+    def forces(self):
+        # Fuerzas (N, 2) sobre cada partícula en el estado actual, con el motor de este mundo.
+        # Vectorizado: por bloques de filas y en paralelo si workers > 1
+        if self.dtype is None:
+            return np.array(self._loop_forces())
+        if self._arrays is None:
+            self._pack()
+        a = self._arrays
+        bounds = self.row_blocks()
+        forces = np.empty_like(a["pos"])
+        if self.workers > 1 and len(bounds) > 1:
+            jobs = [_force_pool(self.workers).submit(self._block_forces, a, start, stop, forces) for start, stop in bounds]
+            for job in jobs:
+                job.result()
+        else:
+            for start, stop in bounds:
+                self._block_forces(a, start, stop, forces)
+        return forces
+
+    def _step_arrays(self, dt):
+        # Mismas fuerzas que `step`, evaluadas para todos los pares a la vez
+        forces = self.forces()
+        a = self._arrays
+        pos, vel = a["pos"], a["vel"]
+
+        # Integrar Movimiento (Euler con Amortiguación)
+        vel += forces / a["mass"][:, None] * dt
+        vel *= self.damping
+
+        # Paredes (Rebote simple), antes de avanzar, como en `step`
+        bounds = np.array([self.width, self.height], dtype=pos.dtype)
+        out = (pos < 0) | (pos > bounds)
+        np.clip(pos, 0, bounds, out=pos)
+        vel[out] *= -1
+        pos += vel * dt
+
+        for p, (x, y), (vx, vy) in zip(self.particles, pos.tolist(), vel.tolist()):
+            p.x, p.y, p.vx, p.vy = x, y, vx, vy
+
+# --- Escenarios y Trayectorias ---
+
+# Ion de la tabla de Shannon para cada especie del laboratorio (CO₃²⁻ y la arcilla no escalan)
+LAB_IONS = {"Ca²⁺": "Ca2+", "Hg²⁺": "Hg2+", "S²⁻": "S2-", "K⁺": "K+", "Pb²⁺": "Pb2+"}
+
+def coordination_scale(type_names, coordination):
+    # Factor r(coordinación) / r(por defecto) por especie, leído de la tabla de radios precalculada
+    ions = [LAB_IONS[name] for name in type_names if name in LAB_IONS]
+    if not ions:
+        return {name: 1.0 for name in type_names}
+    ratio = (lookup_radii(ions, coordination=coordination)["radius"] / lookup_radii(ions)["radius"]).tolist()
+    scale = dict(zip([name for name in type_names if name in LAB_IONS], ratio))
+    return {name: scale.get(name, 1.0) for name in type_names}
+
+def create_scenario(scenario_type, dtype=None, seed=None, coordination=None):
+    world = PhysicsWorld(width=15, height=15, dtype=dtype, seed=seed)
+    rng = world.rng # Misma semilla => mismas posiciones iniciales
+    
+    if scenario_type == "A": # Fertilidad (Ca + CO3) - Ordenado
+        # Grid inicial aleatorio
+        for i in range(8):
+            # Cationes Ca2+ (Duros)
+            world.add_particle(Particle(
+                id=f"Ca_{i}", 
+                x=rng.uniform(2, 13), y=rng.uniform(2, 13),
+                type_name="Ca²⁺", charge=2, radius=0.6, mass=40, is_hard=True
+            ))
+            # Aniones CO3-- (Duros)
+            world.add_particle(Particle(
+                id=f"CO3_{i}", 
+                x=rng.uniform(2, 13), y=rng.uniform(2, 13),
+                type_name="CO₃²⁻", charge=-2, radius=0.7, mass=60, is_hard=True
+            ))
+            
+    elif scenario_type == "B": # Contaminación (Hg + S) - Clumping
+        for i in range(8):
+            # Cationes Hg2+ (Blandos)
+            world.add_particle(Particle(
+                id=f"Hg_{i}", 
+                x=rng.uniform(2, 13), y=rng.uniform(2, 13),
+                type_name="Hg²⁺", charge=2, radius=0.8, mass=200, is_hard=False
+            ))
+            # Aniones S2- (Blandos)
+            world.add_particle(Particle(
+                id=f"S_{i}", 
+                x=rng.uniform(2, 13), y=rng.uniform(2, 13),
+                type_name="S²⁻", charge=-2, radius=0.9, mass=32, is_hard=False
+            ))
+
+    elif scenario_type == "C": # Competencia (Arcilla vs K vs Pb)
+        # Suelo Arcilloso (Aniones fijos en el fondo)
+        for i in range(6):
+            p = Particle(id=f"Clay_{i}", x=2.5 + i*2, y=2, type_name="Arcilla⁻", charge=-1, radius=1.0, mass=1000, is_hard=True) # Muy pesada = Fija
+            world.add_particle(p)
+        
+        # Invasores K+ (Duro, ligero) y Pb2+ (Blando, pesado)
+        for i in range(4):
+            world.add_particle(Particle(id=f"K_{i}", x=rng.uniform(2, 13), y=rng.uniform(5, 13), type_name="K⁺", charge=1, radius=0.7, mass=39, is_hard=True))
+            world.add_particle(Particle(id=f"Pb_{i}", x=rng.uniform(2, 13), y=rng.uniform(5, 13), type_name="Pb²⁺", charge=2, radius=0.9, mass=207, is_hard=False))
+
+    # Radios de contacto según la coordinación elegida (None = coordinación por defecto)
+    if coordination is not None:
+        scale = coordination_scale(list(dict.fromkeys(p.type_name for p in world.particles)), coordination)
+        for p in world.particles:
+            p.radius *= scale[p.type_name]
+
+    return world
+
+def create_random_world(n_particles, dtype=None, seed=None, scenarios="ABC"):
+    # Mundo de estrés: N partículas de las especies de los escenarios, neutro en promedio,
+    # en una caja que crece con sqrt(N) para conservar la densidad del laboratorio (16 en 15x15)
+    species = list({p.type_name: p for s in scenarios for p in create_scenario(s).particles}.values())
+    side = 15 * math.sqrt(n_particles / 16)
+    world = PhysicsWorld(width=side, height=side, dtype=dtype, seed=seed)
+    rng = world.rng
+    for i, k in enumerate(rng.integers(len(species), size=n_particles)):
+        t = species[k]
+        world.add_particle(Particle(
+            id=f"{t.id.split('_')[0]}_{i}", x=rng.uniform(0, side), y=rng.uniform(0, side),
+            type_name=t.type_name, charge=t.charge, radius=t.radius, mass=t.mass, is_hard=t.is_hard
+        ))
+    return world
+
+def compact_int_dtype(max_abs):
+    # El entero más pequeño (int8/int16) que representa valores hasta max_abs
+    return np.int8 if max_abs <= np.iinfo(np.int8).max else np.int16
+
+def save_checkpoint(checkpoint):
+    # Checkpoint -> bytes .npz (para descargar o guardar en disco)
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **checkpoint)
+    return buf.getvalue()
+
+def load_checkpoint(data):
+    with np.load(io.BytesIO(data), allow_pickle=False) as arrays:
+        return {name: arrays[name] for name in arrays.files}
+
+class Trajectory:
+    # Trayectoria compacta: posiciones (frames, N, 2) + columnas estáticas por partícula
+    # + checkpoint del mundo en el último frame (None si no se puede continuar)
+    CHECKPOINT_PREFIX = "checkpoint/"
+
+    def __init__(self, world, positions, dtype=np.float64, checkpoint=None):
+        ps = world.particles
+        codes, self.species_names = world.species_codes()
+        self.ids = [p.id for p in ps]
+        self.species = np.array(codes, dtype=compact_int_dtype(len(self.species_names)))
+        self.charge = np.array([p.charge for p in ps], dtype=compact_int_dtype(max(abs(p.charge) for p in ps)))
+        self.radius = np.array([p.radius for p in ps], dtype=dtype)
+        self.is_hard = np.array([p.is_hard for p in ps], dtype=bool)
+        self.positions = np.asarray(positions, dtype=dtype).reshape(-1, len(ps), 2)
+        self.checkpoint = checkpoint
+
+    def __len__(self):
+        return len(self.positions)
+
+    def extend(self, other):
+        # Esta trayectoria seguida de `other` (su continuación desde self.checkpoint)
+        traj = copy.copy(self)
+        traj.positions = np.concatenate([self.positions, other.positions.astype(self.positions.dtype)])
+        traj.checkpoint = other.checkpoint
+        return traj
+
+    def to_arrays(self):
+        arrays = {
+            "ids": np.array(self.ids), "species_names": np.array(self.species_names),
+            "species": self.species, "charge": self.charge, "radius": self.radius,
+            "is_hard": self.is_hard, "positions": self.positions,
+        }
+        for name, array in (self.checkpoint or {}).items():
+            arrays[self.CHECKPOINT_PREFIX + name] = array
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        traj = cls.__new__(cls)
+        traj.ids = arrays["ids"].tolist()
+        traj.species_names = arrays["species_names"].tolist()
+        for name in ("species", "charge", "radius", "is_hard", "positions"):
+            setattr(traj, name, arrays[name])
+        prefix = cls.CHECKPOINT_PREFIX
+        checkpoint = {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+        traj.checkpoint = checkpoint or None # Paquetes antiguos no traen checkpoint
+        return traj
+
+    @property
+    def labels(self):
+        return [self.species_names[c] for c in self.species]
+
+    @property
+    def nbytes(self):
+        arrays = [self.positions, self.species, self.charge, self.radius, self.is_hard, *(self.checkpoint or {}).values()]
+        return sum(a.nbytes for a in arrays)
+
+def run_simulation(world, frames=60, dt=0.05):
+    history = []
+    for _ in range(frames):
+        world.step(dt)
+        history.append(world.positions())
+    return Trajectory(world, history, dtype=world.dtype or np.float64, checkpoint=world.checkpoint())
+
+def resume_simulation(checkpoint, frames=60, dt=0.05):
+    # N frames más desde un checkpoint; `traj.extend(resume_simulation(traj.checkpoint, n))`
+    # da la misma trayectoria que haber corrido todo de una vez
+    return run_simulation(PhysicsWorld.from_checkpoint(checkpoint), frames, dt)
+
+def divergence_frame(a, b, tol=1e-3):
+    # Primer frame en que dos trayectorias se separan más de `tol` (len(a) si nunca)
+    err = np.linalg.norm(a - b, axis=-1).max(axis=1)
+    over = np.nonzero(err > tol)[0]
+    return int(over[0]) if len(over) else len(a)
+
+def precision_report(scenario_type, frames=80, dt=0.05, tol=1e-3, seed=0):
+    """Chequeo de exactitud del modo float32 contra float64 (mismo estado inicial).
+
+    La dinámica del laboratorio es caótica (fuerzas ~1/r^4 a corta distancia), así que
+    ninguna trayectoria es reproducible bit a bit: el propio motor float64 vectorizado se
+    separa del bucle de referencia solo por el orden de las sumas. Por eso se mide:
+
+    - `local_max_error`: error máximo de posición de UN paso float32 partiendo del mismo
+      estado float64, a lo largo de toda la corrida.
+    - `divergence_frame_*`: frames hasta que la trayectoria se separa más de `tol` de la
+      de referencia.
+    - `bytes_*`: tamaño real de las posiciones de cada trayectoria.
+
+    Mismo `seed` => mismo mundo y mismo informe. Medido con seed 0-9 (80 frames): error
+    local mediana ~4e-4, máximo 1.2e-3 en A/B y 2e-2 en C (seed 6, choque a corta
+    distancia); divergencia float32 1-42 frames, float64 reordenado 48-80 (sin separarse).
+
+    El modo float32 reproduce el mismo comportamiento cualitativo (cristalización,
+    clumping, competencia) y es adecuado para visualización, pero no para comparar
+    trayectorias individuales entre motores.
+    """
+    world = create_scenario(scenario_type, seed=seed)
+    reference = copy.deepcopy(world) # Bucle de referencia (floats de Python)
+    double, single = copy.deepcopy(world), copy.deepcopy(world)
+    double.dtype, single.dtype = np.float64, np.float32
+    ref_pos = run_simulation(reference, frames, dt).positions
+    double_pos = run_simulation(double, frames, dt).positions
+    single_traj = run_simulation(single, frames, dt)
+    single_pos = single_traj.positions.astype(np.float64)
+
+    # Error local: un paso float32 desde cada estado float64
+    local = copy.deepcopy(world)
+    local.dtype = np.float64
+    local_errors = []
+    for _ in range(frames):
+        trial = copy.deepcopy(local)
+        trial.dtype, trial._arrays = np.float32, None
+        local.step(dt)
+        trial.step(dt)
+        local_errors.append(float(np.abs(local.positions() - trial.positions()).max()))
+
+    return {
+        "local_max_error": max(local_errors),
+        "divergence_frame_float32": divergence_frame(double_pos, single_pos, tol),
+        "divergence_frame_float64": divergence_frame(ref_pos, double_pos, tol),
+        "bytes_float64": double_pos.nbytes,
+        "bytes_float32": single_traj.positions.nbytes,
+    }
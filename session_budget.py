@@ -0,0 +1,122 @@
+# Presupuesto de Memoria por Sesión
+# Los objetos grandes de cada sesión (trayectorias del laboratorio) se guardan aquí y no en
+# st.session_state, con su tamaño en bytes. Todas las sesiones del servidor comparten un
+# presupuesto global: cuando se supera, se desalojan las sesiones inactivas usadas hace más
+# tiempo (pestañas abandonadas) y la página recalcula o recarga sus datos si el usuario vuelve.
+#
+# Variables de entorno:
+#   ATLAS_SESSION_BUDGET_MB   presupuesto global en MB (por defecto 256)
+#   ATLAS_SESSION_MIN_IDLE_S  segundos sin reruns para considerar inactiva una sesión (por defecto 120)
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+BUDGET_BYTES = int(float(os.environ.get("ATLAS_SESSION_BUDGET_MB", "256")) * 1e6)
+MIN_IDLE_S = float(os.environ.get("ATLAS_SESSION_MIN_IDLE_S", "120"))
+
+
+class SessionStore:
+    """Objetos grandes por sesión con contabilidad de bytes y desalojo LRU de sesiones enteras.
+
+    Solo se desalojan sesiones sin actividad desde hace `min_idle_s`: si todas están activas
+    el presupuesto se excede temporalmente, y se vuelve a él en cuanto alguna queda inactiva
+    (el desalojo se reintenta en cada `put` y `touch`). La sesión que escribe nunca se desaloja
+    a sí misma.
+    """
+
+    def __init__(self, budget_bytes, min_idle_s=MIN_IDLE_S):
+        self.budget_bytes = budget_bytes
+        self.min_idle_s = min_idle_s
+        self.total_bytes = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        # session_id -> {"entries": {nombre: (valor, nbytes)}, "last_seen": monotonic}, en orden LRU
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = {"entries": {}, "last_seen": 0.0}
+        session["last_seen"] = time.monotonic()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def touch(self, session_id):
+        # Marcar la sesión como activa (cada rerun de la página)
+        with self._lock:
+            if session_id in self._sessions:
+                self._session(session_id)
+            self._evict(keep=session_id)
+
+    def put(self, session_id, name, value, nbytes):
+        with self._lock:
+            entries = self._session(session_id)["entries"]
+            if name in entries:
+                self.total_bytes -= entries[name][1]
+            entries[name] = (value, nbytes)
+            self.total_bytes += nbytes
+            self._evict(keep=session_id)
+
+    def get(self, session_id, name):
+        # None si nunca se guardó o si fue desalojado
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or name not in session["entries"]:
+                return None
+            return self._session(session_id)["entries"][name][0]
+
+    def discard(self, session_id, name):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and name in session["entries"]:
+                self.total_bytes -= session["entries"].pop(name)[1]
+                if not session["entries"]: # Sin registro vacío por cada visitante
+                    del self._sessions[session_id]
+
+    def session_bytes(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return sum(n for _, n in session["entries"].values()) if session else 0
+
+    def _evict(self, keep):
+        # Sesiones menos usadas primero, hasta volver al presupuesto; el orden LRU es también
+        # el de last_seen, así que la primera sesión aún activa corta la búsqueda
+        now = time.monotonic()
+        for session_id in list(self._sessions):
+            if self.total_bytes <= self.budget_bytes:
+                break
+            if session_id == keep:
+                continue
+            if now - self._sessions[session_id]["last_seen"] < self.min_idle_s:
+                break
+            freed = sum(n for _, n in self._sessions.pop(session_id)["entries"].values())
+            self.total_bytes -= freed
+            self.evicted_bytes += freed
+            self.evictions += 1
+
+    def stats(self):
+        # Métricas: bytes por sesión (con desglose), total, presupuesto y desalojos
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "budget_bytes": self.budget_bytes,
+                "min_idle_s": self.min_idle_s,
+                "total_bytes": self.total_bytes,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "sessions": {
+                    session_id: {
+                        "bytes": sum(n for _, n in s["entries"].values()),
+                        "idle_s": now - s["last_seen"],
+                        "entries": {name: n for name, (_, n) in s["entries"].items()},
+                    }
+                    for session_id, s in self._sessions.items()
+                },
+            }
+
+
+# Almacén compartido por todas las sesiones del proceso (igual que el límite de simulation_worker)
+store = SessionStore(BUDGET_BYTES)
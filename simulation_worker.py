@@ -0,0 +1,67 @@
+# Worker de Simulación en Segundo Plano
+# Calcula las trayectorias del laboratorio fuera del script de Streamlit,
+# para que la página no se bloquee mientras se generan los frames.
+#
+# Variables de entorno:
+#   ATLAS_MAX_SIM_JOBS  simulaciones simultáneas en todo el servidor (por defecto 2)
+
+import os
+import threading
+
+# Límite global de simulaciones simultáneas (compartido por todas las sesiones del servidor).
+# Son hilos del mismo proceso y el motor por defecto (bucle de Python) retiene el GIL: más de
+# un par a la vez no calcula más rápido, solo le quita CPU a los scripts de Streamlit. El resto
+# espera su turno en el semáforo.
+MAX_CONCURRENT_JOBS = max(1, int(os.environ.get("ATLAS_MAX_SIM_JOBS", "2")))
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT_JOBS)
+
+
+class SimulationJob:
+    """Ejecuta `world.step(dt)` en un hilo y publica cada frame apenas se produce."""
+
+    def __init__(self, key, world, frames, dt, snapshot):
+        self.key = key # Parámetros que identifican la corrida (escenario, frames, dt)
+        self.world = world
+        self.total = frames
+        self.dt = dt
+        self.snapshot = snapshot # world -> frame serializable
+        self.frames = []
+        self.error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sim-{key}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            with _slots:
+                for _ in range(self.total):
+                    if self._cancel.is_set():
+                        return # Corrida obsoleta: liberar CPU cuanto antes
+                    self.world.step(self.dt)
+                    self.frames.append(self.snapshot(self.world)) # append es atómico bajo el GIL
+        except Exception as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def progress(self):
+        return len(self.frames) / self.total if self.total else 1.0
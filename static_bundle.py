@@ -0,0 +1,178 @@
+# Paquete Estático Precalculado
+# Las vistas deterministas (escenarios del laboratorio, lentes de Génesis, filtros de la tabla)
+# se calculan una vez con `python tools/build_bundle.py` y se guardan como artefactos
+# comprimidos con nombre por hash de contenido. Las páginas los cargan en vez de recalcular
+# cuando los parámetros coinciden.
+#
+# Cada clave lleva además DATA_VERSION, un hash del código que genera las vistas (motor, datos,
+# páginas): si cambia cualquiera de esos archivos, las entradas del paquete viejo dejan de
+# coincidir y las páginas vuelven a calcular en vivo hasta el próximo build.
+#
+# Variables de entorno:
+#   ATLAS_BUNDLE_DIR  carpeta del paquete (por defecto ./bundle junto a este archivo)
+#   ATLAS_BUNDLE=off  ignora el paquete y calcula todo en vivo (lo usa el propio build)
+
+import gzip
+import hashlib
+import io
+import json
+import glob
+import os
+import re
+import threading
+
+import numpy as np
+
+import label_layout
+
+BUNDLE_DIR = os.environ.get("ATLAS_BUNDLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bundle"))
+MANIFEST = "manifest.json"
+
+# Artefactos que escribe BundleWriter: <vista>-<16 hex>.<ext> (lo único que el build puede borrar)
+ARTIFACT_NAME = re.compile(r"^[A-Za-z0-9_]+-[0-9a-f]{16}\.(npz|json\.gz|html)$")
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_SOURCES = ["physics_engine.py", "geodata_core.py", "landscape_evolution.py", "label_layout.py"]
+
+_lock = threading.Lock()
+_manifest_cache = {"mtime": None, "entries": {}}
+
+
+def data_version(root=_ROOT):
+    # Hash de las fuentes de las vistas (y de las páginas que arman las figuras); CRLF y LF
+    # dan el mismo hash para que un checkout en Windows no invalide el paquete
+    digest = hashlib.sha256()
+    sources = DATA_SOURCES + sorted(os.path.relpath(p, root) for p in glob.glob(os.path.join(root, "pages", "*.py")))
+    for name in sources:
+        digest.update(name.replace(os.sep, "/").encode("utf-8"))
+        with open(os.path.join(root, name), "rb") as f:
+            digest.update(f.read().replace(b"\r\n", b"\n"))
+    return digest.hexdigest()[:16]
+
+
+DATA_VERSION = data_version()
+
+
+def enabled():
+    return os.environ.get("ATLAS_BUNDLE", "on").lower() not in ("off", "0", "false")
+
+
+def bundle_key(view, params):
+    # Clave canónica: mismo view + mismos parámetros + mismo código => misma clave, sin importar el orden
+    return json.dumps({"view": view, "params": params, "data": DATA_VERSION}, sort_keys=True, ensure_ascii=False)
+
+
+# --- Parámetros de cada vista (una sola definición para las páginas y tools/build_bundle.py) ---
+
+# Semillas por defecto: con ellas las vistas son deterministas y van al paquete
+LAB_SEED = 0
+GENESIS_SEED = 0
+
+
+def lab_params(sim_params):
+    # sim_params = (escenario, frames, dt, dtype, semilla, coordinación), la clave de la corrida
+    scenario_code, frames, dt, dtype, seed, coordination = sim_params
+    engine = "reference" if dtype is None else np.dtype(dtype).name
+    return {"scenario": scenario_code, "frames": frames, "dt": dt, "engine": engine, "seed": seed,
+            "coordination": coordination}
+
+
+def genesis_params(view_mode, seed=GENESIS_SEED):
+    return {"view_mode": view_mode, "seed": seed}
+
+
+def tabla_params(grupos, coordinacion):
+    # La posición de las etiquetas depende del algoritmo de acomodo: su versión va en la clave
+    return {"grupos": sorted(grupos), "coordinacion": coordinacion, "layout": label_layout.LAYOUT_VERSION}
+
+
+def content_name(view, ext, payload):
+    return f"{view}-{hashlib.sha256(payload).hexdigest()[:16]}.{ext}"
+
+
+def _manifest(bundle_dir):
+    # Se relee solo si el manifiesto cambió en disco (p. ej. tras un nuevo build)
+    path = os.path.join(bundle_dir, MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    with _lock:
+        if _manifest_cache["mtime"] != (path, mtime):
+            with open(path, encoding="utf-8") as f:
+                _manifest_cache["entries"] = json.load(f)
+            _manifest_cache["mtime"] = (path, mtime)
+        return _manifest_cache["entries"]
+
+
+def _lookup(view, params, kind, bundle_dir=None):
+    if not enabled():
+        return None
+    bundle_dir = bundle_dir or BUNDLE_DIR
+    entry = _manifest(bundle_dir).get(bundle_key(view, params))
+    if not entry or kind not in entry:
+        return None
+    return os.path.join(bundle_dir, entry[kind])
+
+
+# --- Lectura (páginas) ---
+
+def load_arrays(view, params, bundle_dir=None):
+    """Arreglos precalculados (dict nombre -> ndarray) o None si no hay artefacto."""
+    path = _lookup(view, params, "arrays", bundle_dir)
+    if path is None:
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+def load_figure(view, params, bundle_dir=None):
+    """Figura Plotly precalculada (dict JSON) o None si no hay artefacto."""
+    path = _lookup(view, params, "figure", bundle_dir)
+    if path is None:
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- Escritura (build) ---
+
+class BundleWriter:
+    """Escribe artefactos con nombre por hash de contenido y el manifiesto que los indexa."""
+
+    def __init__(self, bundle_dir=None):
+        self.bundle_dir = bundle_dir or BUNDLE_DIR
+        self.entries = {}
+        os.makedirs(self.bundle_dir, exist_ok=True)
+
+    def _write(self, view, params, kind, name, payload):
+        path = os.path.join(self.bundle_dir, name)
+        if not os.path.exists(path): # Mismo contenido => mismo archivo, no se reescribe
+            with open(path, "wb") as f:
+                f.write(payload)
+        self.entries.setdefault(bundle_key(view, params), {})[kind] = name
+        return name
+
+    def add_arrays(self, view, params, arrays):
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **arrays)
+        # Hash sobre el contenido de los arreglos (el zip lleva fechas y no es reproducible)
+        digest = hashlib.sha256()
+        for name in sorted(arrays):
+            digest.update(name.encode())
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        name = f"{view}-{digest.hexdigest()[:16]}.npz"
+        return self._write(view, params, "arrays", name, buf.getvalue())
+
+    def add_figure(self, view, params, figure_json):
+        data = figure_json.encode("utf-8")
+        payload = gzip.compress(data, mtime=0)
+        return self._write(view, params, "figure", content_name(view, "json.gz", payload), payload)
+
+    def add_html(self, view, params, html):
+        payload = html.encode("utf-8")
+        return self._write(view, params, "html", content_name(view, "html", payload), payload)
+
+    def write_manifest(self):
+        with open(os.path.join(self.bundle_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True, ensure_ascii=False)
@@ -0,0 +1,92 @@
+# Benchmark del Motor de Fuerzas
+# Mide el paso vectorizado de PhysicsWorld en mundos de estrés (create_random_world) con
+# distinto número de hilos, y la memoria temporal pico con y sin bloques de filas.
+#
+# Uso:
+#   python tools/bench_engine.py --particles 500 2000 4000 --workers 1 2 4 8 16 32
+#
+# La memoria pico se mide con tracemalloc (NumPy registra sus buffers ahí) en un solo paso;
+# "sin bloques" evalúa los N x N pares de una vez, como el kernel original.
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np # noqa: E402
+
+from physics_engine import BLOCK_PAIRS, create_random_world # noqa: E402
+
+
+def time_step(world, steps, dt):
+    world.step(dt) # Empaquetar arreglos y calentar el pool fuera de la medición
+    start = time.perf_counter()
+    for _ in range(steps):
+        world.step(dt)
+    return (time.perf_counter() - start) / steps
+
+
+def peak_step_mb(world, dt):
+    world.step(dt)
+    tracemalloc.start()
+    world.step(dt)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def bench(n_particles, workers, steps, dt, dtype, seed):
+    results = []
+    base = None
+    for w in workers:
+        world = create_random_world(n_particles, dtype=dtype, seed=seed)
+        world.workers = w
+        ms = time_step(world, steps, dt) * 1000
+        base = base or ms
+        results.append({"particles": n_particles, "workers": w, "blocks": len(world.row_blocks()),
+                        "ms_per_step": ms, "speedup": base / ms})
+
+    blocked = create_random_world(n_particles, dtype=dtype, seed=seed)
+    unblocked = create_random_world(n_particles, dtype=dtype, seed=seed)
+    unblocked.block_pairs = n_particles * n_particles
+    memory = {"particles": n_particles, "peak_mb_blocked": peak_step_mb(blocked, dt),
+              "peak_mb_unblocked": peak_step_mb(unblocked, dt)}
+    return results, memory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Escalado por hilos y memoria del kernel de fuerzas.")
+    parser.add_argument("--particles", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--steps", type=int, default=5, help="Pasos medidos por configuración")
+    parser.add_argument("--dtype", choices=["float32", "float64"], default="float64")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guardar los resultados completos en este archivo")
+    args = parser.parse_args(argv)
+
+    dtype = np.dtype(args.dtype).type
+    print(f"{os.cpu_count()} CPUs, {args.dtype}, bloques de hasta {BLOCK_PAIRS} pares (al menos uno por hilo)\n")
+    print(f"{'partículas':>10} {'hilos':>6} {'bloques':>8} {'ms/paso':>9} {'speedup':>8}")
+    all_results, all_memory = [], []
+    for n in args.particles:
+        results, memory = bench(n, args.workers, args.steps, 0.05, dtype, args.seed)
+        for r in results:
+            print(f"{r['particles']:>10} {r['workers']:>6} {r['blocks']:>8} {r['ms_per_step']:>9.1f} {r['speedup']:>8.2f}")
+        all_results += results
+        all_memory.append(memory)
+
+    print(f"\n{'partículas':>10} {'MB pico (bloques)':>18} {'MB pico (N x N)':>16}")
+    for m in all_memory:
+        print(f"{m['particles']:>10} {m['peak_mb_blocked']:>18.1f} {m['peak_mb_unblocked']:>16.1f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"timing": all_results, "memory": all_memory}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
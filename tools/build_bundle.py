@@ -0,0 +1,133 @@
+# Build del Paquete Estático
+# Precalcula todas las vistas deterministas recorriendo las páginas con streamlit AppTest
+# (con el paquete desactivado, es decir, calculando en vivo) y guarda:
+#   - trayectorias del laboratorio (.npz comprimido) -> las carga la página del laboratorio
+#   - figuras de Génesis y de la tabla (.json.gz)     -> las cargan esas páginas
+#   - cada vista como HTML estático (.html) + index.html para servirlas sin Streamlit
+#
+# Uso:
+#   python tools/build_bundle.py [--out bundle/]
+
+import argparse
+import glob
+import html
+import itertools
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["ATLAS_BUNDLE"] = "off" # Calcular todo en vivo al construir
+sys.path.insert(0, ROOT)
+
+import plotly.io as pio # noqa: E402
+from streamlit.testing.v1 import AppTest # noqa: E402
+
+import session_budget # noqa: E402
+import static_bundle # noqa: E402
+from geodata_core import COORDINATION_OPTIONS # noqa: E402
+
+
+def page_path(pattern):
+    return glob.glob(os.path.join(ROOT, "pages", pattern))[0]
+
+
+def figure_spec(at):
+    return at.get("plotly_chart")[0].proto.spec
+
+
+def checked_run(at):
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return at
+
+
+def add_view(writer, view, params, spec, title, pages):
+    page = writer.add_html(view, params, pio.to_html(json.loads(spec), include_plotlyjs="cdn", full_html=True))
+    pages.append((title, page))
+
+
+def build_lab(writer, pages, timeout):
+    at = checked_run(AppTest.from_file(page_path("3_*.py"), default_timeout=timeout))
+    scenarios = at.sidebar.selectbox[0].options
+    for index, compact in itertools.product(range(len(scenarios)), (False, True)):
+        at.sidebar.selectbox[0].select_index(index)
+        at.sidebar.toggle[0].set_value(compact)
+        checked_run(at)
+        if at.session_state["sim_job"] is not None:
+            at.session_state["sim_job"].wait(timeout)
+            checked_run(at)
+
+        params = static_bundle.lab_params(at.session_state["sim_key"])
+        assert params["seed"] == static_bundle.LAB_SEED
+        traj = session_budget.store.get(at.session_state["budget_session"], "simulation_data")
+        writer.add_arrays("lab", params, traj.to_arrays())
+        add_view(writer, "lab", params, figure_spec(at), f"Laboratorio: {scenarios[index]} ({params['engine']})", pages)
+
+
+def build_genesis(writer, pages, timeout):
+    at = checked_run(AppTest.from_file(page_path("4_*.py"), default_timeout=timeout))
+    for view_mode in at.radio[0].options:
+        at.radio[0].set_value(view_mode)
+        spec = figure_spec(checked_run(at))
+        params = static_bundle.genesis_params(view_mode)
+        writer.add_figure("genesis", params, spec)
+        add_view(writer, "genesis", params, spec, f"Génesis: {view_mode}", pages)
+
+
+def build_tabla(writer, pages, timeout):
+    at = checked_run(AppTest.from_file(page_path("2_*.py"), default_timeout=timeout))
+    groups = list(at.sidebar.multiselect[0].options)
+    coordinations = list(at.sidebar.selectbox[0].options)
+    subsets = [s for r in range(len(groups) + 1) for s in itertools.combinations(groups, r)]
+    for index, subset in itertools.product(range(len(coordinations)), subsets):
+        at.sidebar.multiselect[0].set_value(list(subset))
+        at.sidebar.selectbox[0].select_index(index)
+        checked_run(at)
+        spec = figure_spec(at)
+        params = static_bundle.tabla_params(subset, COORDINATION_OPTIONS[coordinations[index]])
+        writer.add_figure("tabla", params, spec)
+        label = f"{', '.join(subset) or '(sin grupos)'} [{coordinations[index]}]"
+        add_view(writer, "tabla", params, spec, f"Tabla: {label}", pages)
+
+
+def write_index(bundle_dir, pages):
+    items = "\n".join(f'<li><a href="{html.escape(page)}">{html.escape(title)}</a></li>' for title, page in pages)
+    with open(os.path.join(bundle_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Atlas Geoquímico</title></head>\n'
+                f"<body><h1>Atlas Geoquímico: vistas precalculadas</h1>\n<ul>\n{items}\n</ul></body></html>\n")
+
+
+def prune(writer):
+    # Borrar artefactos de builds anteriores que ya no referencia el manifiesto; solo nombres
+    # con la forma de BundleWriter, para no tocar otros archivos si --out apunta mal
+    referenced = {name for entry in writer.entries.values() for name in entry.values()}
+    for name in os.listdir(writer.bundle_dir):
+        if static_bundle.ARTIFACT_NAME.match(name) and name not in referenced:
+            os.remove(os.path.join(writer.bundle_dir, name))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precalcula todas las vistas deterministas del atlas.")
+    parser.add_argument("--out", default=static_bundle.BUNDLE_DIR, help="Carpeta de salida")
+    parser.add_argument("--timeout", type=float, default=120, help="Timeout por rerun/simulación (s)")
+    args = parser.parse_args(argv)
+
+    writer = static_bundle.BundleWriter(args.out)
+    pages = []
+    for name, build in (("lab", build_lab), ("genesis", build_genesis), ("tabla", build_tabla)):
+        start = time.perf_counter()
+        build(writer, pages, args.timeout)
+        print(f"{name}: listo en {time.perf_counter() - start:.1f} s")
+
+    writer.write_manifest()
+    write_index(writer.bundle_dir, pages)
+    prune(writer)
+    size = sum(os.path.getsize(p) for p in glob.glob(os.path.join(writer.bundle_dir, "*")))
+    print(f"{len(writer.entries)} vistas, {size / 1e6:.1f} MB en {writer.bundle_dir}")
+
+
+if __name__ == "__main__":
+    main()
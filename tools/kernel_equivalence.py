@@ -0,0 +1,311 @@
+# Arnés de Equivalencia de Kernels
+# Compara cada motor de PhysicsWorld contra el bucle original congelado (reference_kernel.py)
+# en los escenarios A/B/C con varias semillas y en mundos de estrés aleatorios:
+#
+#   fuerzas     error relativo máximo de las fuerzas de UN paso, evaluadas en cada estado de
+#               la trayectoria de referencia (mismo estado de partida para ambos motores)
+#   horizonte   frames hasta que la trayectoria del motor se separa más de pos_tol de la de
+#               referencia. La dinámica es caótica: solo el bucle exacto llega al final
+#   energía     deriva E(t) - E(0) del motor menos la de referencia, promediada sobre todos
+#               los frames de la corrida, / max |E| de ambas corridas (los colapsos a corta
+#               distancia disparan E a ~1e8: la escala común acota cada mundo a [-2, 2])
+#   pedagogía   fracción de cationes en contacto con un anión y distancia media catión-anión
+#               más cercana en el último frame (cristalización en A, clumping Hg/S en B,
+#               competencia en C)
+#
+# Pasado el horizonte cada mundo es otra realización caótica, así que energía y pedagogía se
+# juzgan por escenario: el sesgo medio (diferencias con signo, promediadas sobre semillas)
+# debe caber en la tolerancia más dos errores estándar de ese promedio (con un solo mundo no
+# hay veredicto). Una tolerancia None deja la métrica solo informativa. Los motores que se
+# separan enseguida (float32) necesitan muchas más semillas para que ese promedio discrimine:
+# SEEDS fija su número por defecto, el resto usa --seeds.
+#
+# Uso:
+#   python tools/kernel_equivalence.py [--frames 40] [--seeds 3] [--float32-seeds 24] [--stress 32 96]
+#                                      [--kernels float32 threaded] [--tol float32.force_rtol=1e-3]
+# Sale con código 1 si algún motor queda fuera de tolerancia.
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np # noqa: E402
+
+from physics_engine import PhysicsWorld, create_random_world, create_scenario, divergence_frame # noqa: E402
+from reference_kernel import reference_forces, reference_step # noqa: E402
+
+DT = 0.05
+
+# Motores a comparar: atributos que se fijan en un PhysicsWorld restaurado del mismo estado
+KERNELS = {
+    "loop": {"dtype": None}, # Bucle con tablas de interacción (debe ser bit a bit igual)
+    "float64": {"dtype": np.float64},
+    "float32": {"dtype": np.float32},
+    "threaded": {"dtype": np.float64, "workers": 4, "block_pairs": 32}, # 2 filas por bloque en A/B/C (N <= 16)
+}
+
+# Tolerancias por motor (se pueden cambiar con --tol motor.métrica=valor)
+#   force_rtol    error de fuerzas máximo / |fuerza de referencia| máxima
+#   pos_tol       separación de posiciones que corta el horizonte
+#   min_horizon   frames mínimos antes de separarse más de pos_tol (acotado a --frames)
+#   energy_atol   sesgo máximo de la deriva de energía
+#   contact_atol  sesgo máximo de fracción de contacto
+#   nn_rtol       sesgo relativo máximo de distancia catión-anión
+# El bucle de tablas debe ser bit a bit igual; float64 y los bloques solo difieren en el orden
+# de las sumas; float32 redondea posiciones a ~1e-6 relativo, error que los términos 1/r^4 de
+# contacto amplifican (hasta ~1e-2 en mundos densos) y que lo separa en 0-40 frames (mediana
+# ~7): su horizonte solo se informa. Energía y pedagogía sí se exigen, sobre SEEDS["float32"]
+# semillas por escenario: con 24 el error estándar del sesgo baja a ~0.02 en energía y ~0.05
+# en contacto, y un cambio físico real (p. ej. amortiguación 0.90 -> 0.85: sesgo de energía
+# -0.08 ± 0.03 en estrés) queda fuera mientras float32 pasa en cuatro juegos de semillas
+# distintos. Con 3-5 semillas (±1 en energía) no discriminaban nada.
+TOLERANCES = {
+    "loop": {"force_rtol": 0.0, "pos_tol": 0.0, "min_horizon": 10**9,
+             "energy_atol": 0.0, "contact_atol": 0.0, "nn_rtol": 0.0},
+    "float64": {"force_rtol": 1e-12, "pos_tol": 1e-6, "min_horizon": 20,
+                "energy_atol": 0.05, "contact_atol": 0.1, "nn_rtol": 0.1},
+    "float32": {"force_rtol": 1e-2, "pos_tol": 1e-3, "min_horizon": None,
+                "energy_atol": 0.02, "contact_atol": 0.05, "nn_rtol": 0.1},
+    "threaded": {"force_rtol": 1e-12, "pos_tol": 1e-6, "min_horizon": 20,
+                 "energy_atol": 0.05, "contact_atol": 0.1, "nn_rtol": 0.1},
+}
+
+# Semillas por escenario y por tamaño de estrés de los motores que no usan --seeds
+SEEDS = {"float32": 24}
+
+
+def configure(world, kernel):
+    for name, value in KERNELS[kernel].items():
+        setattr(world, name, value)
+    world._arrays = None # Reempaquetar con el dtype del motor
+    return world
+
+
+def kernel_world(reference, kernel):
+    # Copia del estado actual de `reference` (posiciones, velocidades, RNG) con otro motor
+    return configure(PhysicsWorld.from_checkpoint(reference.checkpoint()), kernel)
+
+
+def state(world):
+    # Posiciones y velocidades (N, 2) en float64
+    s = np.array([[p.x, p.y, p.vx, p.vy] for p in world.particles])
+    return s[:, :2], s[:, 2:]
+
+
+def energy(world, pos, vel):
+    """Energía cinética + potencial de las fuerzas implementadas (U(r) = integral de r a inf de F).
+
+    El motor no conserva energía (amortiguación, paredes, distancia mínima 0.1, y el colapso
+    a corta distancia la multiplica por millones): es un diagnóstico para comparar motores,
+    no una cantidad conservada.
+    """
+    codes, table = world.interactions()
+    ix = np.ix_(codes, codes)
+    q, c, s, cut = (getattr(table, name)[ix] for name in ("charge_product", "contact_dist", "soft_strength", "soft_cutoff"))
+    d = pos[None, :, :] - pos[:, None, :]
+    r = np.sqrt((d * d).sum(axis=-1))
+    iu = np.triu_indices(len(pos), k=1) # Cada par una vez
+    r, q, c, s, cut = (m[iu] for m in (r, q, c, s, cut))
+    r = np.maximum(r, 0.1)
+    u = -world.k_coulomb * q / r
+    u += np.where(r < c, -world.k_repulsion / 3 * (1 / r**3 - 1 / c**3), 0.0)
+    u += np.where(r < cut, s * (1 / np.maximum(r, c) - 1 / cut), 0.0)
+    mass = np.array([p.mass for p in world.particles])
+    return 0.5 * (mass[:, None] * vel**2).sum() + u.sum()
+
+
+def pedagogy(world, pos):
+    # Fracción de cationes con un anión a menos de 1.5 x contacto y distancia media al más cercano
+    charge = np.array([p.charge for p in world.particles])
+    radius = np.array([p.radius for p in world.particles])
+    cations, anions = np.flatnonzero(charge > 0), np.flatnonzero(charge < 0)
+    if not len(cations) or not len(anions):
+        return {"contact": 0.0, "nn": 0.0}
+    r = np.linalg.norm(pos[cations][:, None, :] - pos[anions][None, :, :], axis=-1)
+    contact = (radius[cations][:, None] + radius[anions][None, :]) * 0.8
+    return {"contact": float((r < 1.5 * contact).any(axis=1).mean()), "nn": float(r.min(axis=1).mean())}
+
+
+def run_reference(world, frames):
+    # Trayectoria del kernel congelado + los estados intermedios (checkpoints) para las fuerzas;
+    # energies[0] es la del estado inicial
+    positions, energies, checkpoints = [], [energy(world, *state(world))], [world.checkpoint()]
+    for _ in range(frames):
+        reference_step(world, DT)
+        world.steps += 1 # Para que el checkpoint quede al día (reference_step no lo cuenta)
+        pos, vel = state(world)
+        positions.append(pos)
+        energies.append(energy(world, pos, vel))
+        checkpoints.append(world.checkpoint())
+    return {"positions": np.array(positions), "energies": np.array(energies),
+            "checkpoints": checkpoints, "world": world}
+
+
+def check_world(label, group, make_world, kernels, frames, tolerances):
+    ref = run_reference(make_world(), frames)
+    energy_scale = np.abs(ref["energies"]).max() or 1.0
+    ref_drift = ref["energies"] - ref["energies"][0]
+    ref_pedagogy = pedagogy(ref["world"], ref["positions"][-1])
+    rows = []
+    for kernel in kernels:
+        # Fuerzas de un paso desde cada estado de la referencia
+        force_err = 0.0
+        for checkpoint in ref["checkpoints"][:-1]:
+            world = configure(PhysicsWorld.from_checkpoint(checkpoint), kernel)
+            expected = reference_forces(world)
+            expected = np.array([expected[p.id] for p in world.particles])
+            got = world.forces().astype(np.float64)
+            scale = np.abs(expected).max() or 1.0
+            force_err = max(force_err, float(np.abs(got - expected).max() / scale))
+
+        # Trayectoria completa desde el mismo estado inicial, con la energía de cada frame
+        world = configure(PhysicsWorld.from_checkpoint(ref["checkpoints"][0]), kernel)
+        positions, energies = [], [energy(world, *state(world))]
+        for _ in range(frames):
+            world.step(DT)
+            pos, vel = state(world)
+            positions.append(pos)
+            energies.append(energy(world, pos, vel))
+        drift = np.array(energies) - energies[0]
+
+        # Bloques de filas en que se parte el cálculo (comprobar que el camino por hilos se usa)
+        n = len(world.particles)
+        blocks = len(world.row_blocks()) if world.dtype is not None else 0
+        rows.append({
+            "kernel": kernel, "world": label, "group": group, "particles": n,
+            "workers": world.workers, "blocks": blocks,
+            "force_rel_err": force_err,
+            "horizon": divergence_frame(ref["positions"], np.array(positions), tolerances[kernel]["pos_tol"]),
+            # Diferencia de derivas E(t) - E(0) entre motor y referencia, promediada en la corrida
+            "energy_diff": float((drift - ref_drift)[1:].mean() / max(energy_scale, np.abs(energies).max())),
+            "pedagogy": pedagogy(world, pos), "pedagogy_ref": ref_pedagogy,
+        })
+    return rows
+
+
+def bias(diffs):
+    # Promedio con signo y dos errores estándar (0 con un solo mundo)
+    diffs = np.asarray(diffs, dtype=float)
+    spread = 2 * diffs.std(ddof=1) / np.sqrt(len(diffs)) if len(diffs) > 1 else 0.0
+    return float(diffs.mean()), float(spread)
+
+
+def evaluate(rows, tolerances, frames):
+    # Marca cada fila y devuelve el resumen de energía y pedagogía por (motor, grupo)
+    for row in rows:
+        tol = tolerances[row["kernel"]]
+        row["failures"] = [name for name, ok in (
+            ("fuerzas", row["force_rel_err"] <= tol["force_rtol"]),
+            ("horizonte", tol["min_horizon"] is None or row["horizon"] >= min(tol["min_horizon"], frames)),
+            ("sin hilos", row["workers"] <= 1 or row["blocks"] > 1), # Un solo bloque no usa el pool
+        ) if not ok]
+        got, ref = row["pedagogy"], row["pedagogy_ref"]
+        row["contact_diff"] = got["contact"] - ref["contact"]
+        row["nn_diff"] = (got["nn"] - ref["nn"]) / max(ref["nn"], 1e-12)
+
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["kernel"], row["group"]), []).append(row)
+    summary = []
+    for (kernel, group), members in groups.items():
+        tol = tolerances[kernel]
+        entry = {"kernel": kernel, "group": group, "worlds": len(members), "failures": []}
+        for metric, limit, name in (("energy_diff", "energy_atol", "energía"),
+                                    ("contact_diff", "contact_atol", "contacto"),
+                                    ("nn_diff", "nn_rtol", "distancia")):
+            mean, spread = bias([m[metric] for m in members])
+            entry[metric] = {"mean": mean, "spread": spread}
+            if tol[limit] is not None and len(members) > 1 and abs(mean) > tol[limit] + spread:
+                entry["failures"].append(name)
+        summary.append(entry)
+    return summary
+
+
+def forces_only(tol):
+    # Motores cuyas métricas de trayectoria son todas informativas
+    return all(tol[m] is None for m in ("min_horizon", "energy_atol", "contact_atol", "nn_rtol"))
+
+
+def print_report(rows, summary, frames, tolerances):
+    line = f"{'motor':<9} {'mundo':<16} {'N':>4} {'bloques':>7} {'err. fuerzas':>12} {'horizonte':>10} {'Δ deriva E':>10}  resultado"
+    print(line)
+    print("-" * len(line))
+    for r in rows:
+        status = "OK" if not r["failures"] else "FALLA: " + ", ".join(r["failures"])
+        print(f"{r['kernel']:<9} {r['world']:<16} {r['particles']:>4} {r['blocks'] or '-':>7} {r['force_rel_err']:>12.2e} "
+              f"{r['horizon']:>5}/{frames:<4} {r['energy_diff']:>+10.3f}  {status}")
+
+    line = f"{'motor':<9} {'grupo':<8} {'mundos':>6} {'sesgo deriva E':>16} {'sesgo contacto':>16} {'sesgo dist. rel.':>16}  resultado"
+    print("\n" + line)
+    print("-" * len(line))
+    for s in summary:
+        status = "OK" if not s["failures"] else "FALLA: " + ", ".join(s["failures"])
+        if s["worlds"] < 2:
+            status = "sin veredicto (1 mundo)"
+        elif forces_only(tolerances[s["kernel"]]):
+            status = "informativo"
+        cells = " ".join(f"{s[m]['mean']:>+7.3f} ±{s[m]['spread']:>6.3f}" for m in ("energy_diff", "contact_diff", "nn_diff"))
+        print(f"{s['kernel']:<9} {s['group']:<8} {s['worlds']:>6} {cells}  {status}")
+
+    judged = sorted({s["kernel"] for s in summary if forces_only(tolerances[s["kernel"]])})
+    if judged:
+        print(f"\n{', '.join(judged)}: veredicto solo por las fuerzas de un paso; horizonte, energía "
+              f"y pedagogía son informativos (se exigen con --tol, p. ej. {judged[0]}.energy_atol=0.5)")
+
+
+def parse_tolerances(overrides):
+    tolerances = {kernel: dict(tol) for kernel, tol in TOLERANCES.items()}
+    for item in overrides:
+        key, _, value = item.partition("=")
+        kernel, _, metric = key.partition(".")
+        if kernel not in tolerances or metric not in tolerances[kernel]:
+            raise SystemExit(f"Tolerancia desconocida: {key}")
+        tolerances[kernel][metric] = float(value)
+    return tolerances
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Equivalencia de los motores de física contra el bucle original.")
+    parser.add_argument("--frames", type=int, default=40, help="Frames por corrida")
+    parser.add_argument("--seeds", type=int, default=3, help="Semillas por escenario A/B/C y por tamaño de estrés")
+    parser.add_argument("--float32-seeds", type=int, default=SEEDS["float32"], help="Semillas para float32 (ídem)")
+    parser.add_argument("--stress", type=int, nargs="*", default=[32, 96], help="Tamaños de mundos aleatorios")
+    parser.add_argument("--kernels", nargs="+", choices=sorted(KERNELS), default=list(KERNELS))
+    parser.add_argument("--tol", nargs="*", default=[], metavar="MOTOR.MÉTRICA=VALOR", help="Cambiar tolerancias")
+    parser.add_argument("--json", help="Guardar los resultados completos en este archivo")
+    args = parser.parse_args(argv)
+    tolerances = parse_tolerances(args.tol)
+
+    seeds = {kernel: args.seeds for kernel in args.kernels}
+    if "float32" in seeds:
+        seeds["float32"] = args.float32_seeds
+    n_seeds = max(seeds.values())
+    worlds = [(f"{s} seed={seed}", s, seed, lambda s=s, seed=seed: create_scenario(s, seed=seed))
+              for s in "ABC" for seed in range(n_seeds)]
+    worlds += [(f"estrés N={n} s={seed}", "estrés", seed, lambda n=n, seed=seed: create_random_world(n, seed=seed))
+               for n in args.stress for seed in range(n_seeds)]
+
+    start = time.perf_counter()
+    rows = []
+    for label, group, seed, make_world in worlds:
+        kernels = [kernel for kernel in args.kernels if seed < seeds[kernel]] # Cada motor, sus semillas
+        rows += check_world(label, group, make_world, kernels, args.frames, tolerances)
+    summary = evaluate(rows, tolerances, args.frames)
+    print_report(rows, summary, args.frames, tolerances)
+
+    failed = any(r["failures"] for r in rows) or any(s["failures"] for s in summary)
+    print(f"\n{'FALLA' if failed else 'OK'}: {len(rows)} corridas de {len(args.kernels)} motores en {len(worlds)} mundos "
+          f"en {time.perf_counter() - start:.1f} s")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"tolerances": tolerances, "rows": rows, "summary": summary}, f, indent=2, default=float)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Regresiones del Laboratorio
+# Comprobaciones de comportamiento exacto del laboratorio atómico, con veredicto sí/no:
+#
+#   reanudar    80 frames + checkpoint + 40 frames == 120 frames de una vez, bit a bit, en los
+#               tres motores (bucle de referencia, float32, float64) y escenarios A/B/C. El
+#               checkpoint pasa por save/load_checkpoint y la trayectoria por to/from_arrays
+#               (los caminos de la descarga y del paquete estático)
+#   continuar   lo mismo a través de la página (streamlit AppTest): botón "Continuar" sobre la
+#               corrida por defecto, en modo normal y compacto
+#   lru         reglas de desalojo de session_budget.SessionStore: solo sesiones inactivas, la
+#               menos usada primero, nunca la que escribe, y sin registros vacíos
+#   desalojo    dos sesiones de la página con un presupuesto para una sola trayectoria: la
+#               sesión inactiva se desaloja y, al volver, recupera la misma trayectoria (con
+#               sus frames de "Continuar") bit a bit
+#
+# Uso:
+#   python tools/lab_regression.py [--checks reanudar continuar lru desalojo]
+# Sale con código 1 si alguna comprobación falla.
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ["ATLAS_BUNDLE"] = "off" # La página calcula en vivo: se prueba el worker, no el paquete
+sys.path.insert(0, ROOT)
+
+import numpy as np # noqa: E402
+
+import session_budget # noqa: E402
+from physics_engine import (Trajectory, create_scenario, load_checkpoint, resume_simulation, # noqa: E402
+                            run_simulation, save_checkpoint)
+
+DT = 0.05
+FRAMES, EXTRA = 80, 40
+ENGINES = {"referencia": None, "float32": np.float32, "float64": np.float64}
+
+
+def lab_page():
+    return glob.glob(os.path.join(ROOT, "pages", "3_*.py"))[0]
+
+
+def same_checkpoint(a, b):
+    return a.keys() == b.keys() and all(np.array_equal(a[k], b[k]) for k in a)
+
+
+def check_resume(seed=0):
+    failures = []
+    for (engine, dtype), scenario in ((e, s) for e in ENGINES.items() for s in "ABC"):
+        full = run_simulation(create_scenario(scenario, dtype=dtype, seed=seed), FRAMES + EXTRA, DT)
+        head = run_simulation(create_scenario(scenario, dtype=dtype, seed=seed), FRAMES, DT)
+        head = Trajectory.from_arrays(head.to_arrays())
+        tail = resume_simulation(load_checkpoint(save_checkpoint(head.checkpoint)), EXTRA, DT)
+        joined = head.extend(tail)
+        ok = (joined.positions.dtype == full.positions.dtype and np.array_equal(joined.positions, full.positions)
+              and same_checkpoint(joined.checkpoint, full.checkpoint))
+        print(f"  reanudar {engine:<10} {scenario}: {'ok' if ok else 'FALLA'}")
+        if not ok:
+            failures.append(f"reanudar {engine} {scenario}")
+    return failures
+
+
+def settle(at, timeout=120):
+    # Reruns hasta que no quede simulación en marcha (como el fragmento de vista previa)
+    deadline = time.monotonic() + timeout
+    at.run()
+    while at.session_state["sim_job"] is not None and time.monotonic() < deadline:
+        at.session_state["sim_job"].wait(1)
+        at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return session_budget.store.get(at.session_state["budget_session"], "simulation_data")
+
+
+def check_continue():
+    from streamlit.testing.v1 import AppTest
+
+    failures = []
+    for compact in (False, True):
+        at = AppTest.from_file(lab_page(), default_timeout=120)
+        at.run()
+        at.sidebar.toggle[0].set_value(compact)
+        settle(at)
+        next(b for b in at.sidebar.button if "Continuar" in b.label).click()
+        traj = settle(at)
+        scenario, frames, dt, dtype, seed, coordination = at.session_state["sim_key"]
+        expected = run_simulation(create_scenario(scenario, dtype=dtype, seed=seed, coordination=coordination),
+                                  frames + EXTRA, dt)
+        ok = (traj is not None and len(traj) == frames + EXTRA
+              and np.array_equal(traj.positions, expected.positions.astype(traj.positions.dtype)))
+        engine = "float32" if compact else "referencia"
+        print(f"  continuar {engine:<10} {scenario}: {'ok' if ok else 'FALLA'}")
+        if not ok:
+            failures.append(f"continuar {engine}")
+        session_budget.store.discard(at.session_state["budget_session"], "simulation_data")
+    return failures
+
+
+def check_lru(idle=0.2):
+    failures = []
+
+    def expect(name, condition):
+        print(f"  lru {name}: {'ok' if condition else 'FALLA'}")
+        if not condition:
+            failures.append(f"lru {name}")
+
+    # Sesiones activas: el presupuesto se excede pero no se desaloja a nadie
+    store = session_budget.SessionStore(100, min_idle_s=idle)
+    store.put("a", "traj", "A", 60)
+    store.put("b", "traj", "B", 60)
+    expect("activas se conservan", store.evictions == 0 and store.total_bytes == 120)
+    # Al quedar inactivas, el próximo touch desaloja la menos usada y se detiene dentro del presupuesto
+    time.sleep(idle * 1.5)
+    store.touch("c")
+    expect("inactiva LRU primero", store.get("a", "traj") is None and store.get("b", "traj") == "B"
+           and store.evictions == 1 and store.total_bytes == 60)
+
+    # Una inactiva vieja se desaloja; la primera activa corta la búsqueda aunque siga excedido
+    store = session_budget.SessionStore(100, min_idle_s=idle)
+    store.put("a", "traj", "A", 30)
+    time.sleep(idle * 1.5)
+    store.put("b", "traj", "B", 60)
+    store.put("c", "traj", "C", 60)
+    expect("activa corta la búsqueda", store.get("a", "traj") is None and store.get("b", "traj") == "B"
+           and store.get("c", "traj") == "C" and store.total_bytes == 120)
+
+    # La sesión que escribe no se desaloja a sí misma, aunque esté inactiva
+    store = session_budget.SessionStore(100, min_idle_s=idle)
+    store.put("a", "traj", "A", 60)
+    time.sleep(idle * 1.5)
+    store.put("a", "extra", "A2", 60)
+    expect("no se desaloja quien escribe", store.evictions == 0 and store.session_bytes("a") == 120)
+
+    # discard de la última entrada borra el registro de la sesión
+    store.discard("a", "traj")
+    store.discard("a", "extra")
+    expect("sin registros vacíos", store.stats()["sessions"] == {} and store.total_bytes == 0)
+    return failures
+
+
+def check_eviction(idle=0.5):
+    from streamlit.testing.v1 import AppTest
+
+    store = session_budget.store
+    saved = store.budget_bytes, store.min_idle_s
+    store.min_idle_s = idle
+    try:
+        first = AppTest.from_file(lab_page(), default_timeout=120)
+        settle(first)
+        next(b for b in first.sidebar.button if "Continuar" in b.label).click()
+        original = settle(first)
+        first_id = first.session_state["budget_session"]
+        store.budget_bytes = original.nbytes # Cabe una sola trayectoria
+        evictions = store.evictions
+
+        time.sleep(idle * 1.5) # La primera sesión queda inactiva
+        second = AppTest.from_file(lab_page(), default_timeout=120)
+        settle(second)
+        evicted = store.get(first_id, "simulation_data") is None and store.evictions == evictions + 1
+
+        restored = settle(first) # Al volver: se recalcula con los mismos parámetros y frames extra
+        ok = (evicted and restored is not None and len(restored) == len(original)
+              and np.array_equal(restored.positions, original.positions)
+              and same_checkpoint(restored.checkpoint, original.checkpoint))
+        print(f"  desalojo: {'ok' if evicted else 'FALLA'}; restauración {len(original)} frames: {'ok' if ok else 'FALLA'}")
+        for at in (first, second):
+            store.discard(at.session_state["budget_session"], "simulation_data")
+        return [] if ok else ["desalojo y restauración"]
+    finally:
+        store.budget_bytes, store.min_idle_s = saved
+
+
+CHECKS = {
+    "reanudar": check_resume,
+    "continuar": check_continue,
+    "lru": check_lru,
+    "desalojo": check_eviction,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Regresiones de comportamiento exacto del laboratorio.")
+    parser.add_argument("--checks", nargs="+", choices=list(CHECKS), default=list(CHECKS))
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    failures = []
+    for name in args.checks:
+        print(f"{name}:")
+        failures += CHECKS[name]()
+    print(f"\n{'FALLA' if failures else 'OK'}: {len(args.checks)} comprobaciones en {time.perf_counter() - start:.1f} s")
+    for failure in failures:
+        print(f"  - {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
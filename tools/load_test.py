@@ -0,0 +1,444 @@
+# Arnés de Carga Multi-Sesión
+# Simula un aula entera usando las cuatro páginas a la vez, sin navegador.
+#
+# Uso:
+#   python tools/load_test.py --sessions 1 8 32 --rounds 3                # servidor real
+#   python tools/load_test.py --mode isolated --sessions 1 8 --rounds 3   # costo por sesión
+#
+# --mode server (por defecto): arranca un `streamlit run` real por nivel y lo maneja con N
+#   clientes websocket concurrentes (el mismo protocolo que el navegador). Mide la capacidad
+#   del servidor: todas las sesiones comparten un proceso, el GIL entre los hilos de script y
+#   los SimulationJob, el semáforo de simulation_worker y session_budget.store. CPU y memoria
+#   (RSS pico) se leen de /proc del proceso del servidor (solo Linux).
+# --mode isolated: cada sesión corre con streamlit AppTest en su propio proceso (AppTest
+#   instala estado global y no admite dos sesiones por proceso). Mide el costo de una sesión
+#   AISLADA: sin contención entre sesiones, así que p95/p99 son optimistas en máquinas con
+#   varios núcleos y "MB tot" es una extrapolación, no una medida.
+
+import argparse
+import asyncio
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def page_path(pattern):
+    return glob.glob(os.path.join(ROOT, pattern))[0]
+
+
+PAGES = {
+    "inicio": lambda: page_path("1_*.py"),
+    "tabla": lambda: page_path(os.path.join("pages", "2_*.py")),
+    "lab": lambda: page_path(os.path.join("pages", "3_*.py")),
+    "genesis": lambda: page_path(os.path.join("pages", "4_*.py")),
+}
+
+
+class Recorder:
+    """Acumula latencias de rerun por página para una sesión."""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = 0
+
+    def run(self, page, at):
+        start = time.perf_counter()
+        at.run()
+        self.samples.setdefault(page, []).append(time.perf_counter() - start)
+        self.errors += len(at.exception)
+        return at
+
+
+# --- Interacciones típicas por página ---
+
+def script_inicio(rec, at, rounds):
+    for _ in range(rounds):
+        rec.run("inicio", at)
+
+
+def script_tabla(rec, at, rounds):
+    multiselect = at.sidebar.multiselect[0]
+    groups = list(multiselect.options)
+    for i in range(rounds):
+        # Quitar un grupo y volver a mostrarlos todos
+        multiselect.set_value([g for g in groups if g != groups[i % len(groups)]])
+        rec.run("tabla", at)
+        at.sidebar.multiselect[0].set_value(groups)
+        rec.run("tabla", at)
+
+
+def simulation_ready(at):
+    # Sin job = trayectoria servida desde el paquete estático
+    job = at.session_state["sim_job"]
+    return job is None or job.done
+
+
+def wait_simulation(rec, at, poll=0.3, timeout=60):
+    # Imita el fragmento de vista previa: reruns periódicos hasta que el worker termina
+    deadline = time.monotonic() + timeout
+    while not simulation_ready(at) and time.monotonic() < deadline:
+        time.sleep(poll)
+        rec.run("lab", at)
+    rec.run("lab", at)
+
+
+def script_lab(rec, at, rounds):
+    wait_simulation(rec, at)
+    n_options = len(at.sidebar.selectbox[0].options)
+    for i in range(rounds):
+        at.sidebar.selectbox[0].select_index((i + 1) % n_options)
+        rec.run("lab", at)
+        wait_simulation(rec, at)
+        at.sidebar.button[0].click()
+        rec.run("lab", at)
+        wait_simulation(rec, at)
+
+
+def script_genesis(rec, at, rounds):
+    radio = at.radio[0]
+    options = list(radio.options)
+    for i in range(rounds):
+        at.radio[0].set_value(options[(i + 1) % len(options)])
+        rec.run("genesis", at)
+
+
+SCRIPTS = {
+    "inicio": script_inicio,
+    "tabla": script_tabla,
+    "lab": script_lab,
+    "genesis": script_genesis,
+}
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 # Linux: KiB
+
+
+def run_session(pages, rounds, timeout):
+    """Una sesión completa (en su propio proceso): recorre las páginas y devuelve métricas."""
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT) # Igual que `streamlit run`: la raíz del repo es importable
+    from streamlit.testing.v1 import AppTest
+    import numpy, pandas, plotly.graph_objects # noqa: F401 (parte del RSS base, no de la sesión)
+
+    baseline_rss = peak_rss_mb()
+    cpu_start = time.process_time()
+    rec = Recorder()
+    for page in pages:
+        at = AppTest.from_file(PAGES[page](), default_timeout=timeout)
+        rec.run(page, at)
+        SCRIPTS[page](rec, at, rounds)
+    return {
+        "samples": rec.samples,
+        "errors": rec.errors,
+        "cpu_s": time.process_time() - cpu_start,
+        "peak_rss_mb": peak_rss_mb(),
+        "baseline_rss_mb": baseline_rss,
+    }
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * q / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values):
+    return {
+        "reruns": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+    }
+
+
+def run_level(sessions, pages, rounds, timeout):
+    """Corre `sessions` sesiones aisladas concurrentes (un proceso cada una) y agrega sus métricas."""
+    ctx = multiprocessing.get_context("spawn")
+    wall_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=sessions, mp_context=ctx) as pool:
+        futures = [pool.submit(run_session, pages, rounds, timeout) for _ in range(sessions)]
+        results = [f.result() for f in futures]
+    wall = time.perf_counter() - wall_start
+
+    per_page = {}
+    for r in results:
+        for page, values in r["samples"].items():
+            per_page.setdefault(page, []).extend(values)
+    all_samples = [t for values in per_page.values() for t in values]
+    cpu = sum(r["cpu_s"] for r in results)
+    marginal_rss = [r["peak_rss_mb"] - r["baseline_rss_mb"] for r in results]
+    return {
+        "sessions": sessions,
+        **summarize(all_samples),
+        "per_page": {page: summarize(values) for page, values in per_page.items()},
+        "errors": sum(r["errors"] for r in results),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_util": cpu / wall if wall else 0.0, # 1.0 = un núcleo completo
+        "baseline_rss_mb": min(r["baseline_rss_mb"] for r in results),
+        "peak_rss_mb_per_session": max(marginal_rss),
+        "peak_rss_mb_total": sum(marginal_rss) + min(r["baseline_rss_mb"] for r in results),
+    }
+
+
+# --- Modo servidor: un `streamlit run` real y N clientes websocket ---
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60):
+    cmd = [sys.executable, "-m", "streamlit", "run", page_path("1_*.py"),
+           "--server.headless", "true", "--server.port", str(port), "--server.address", "127.0.0.1",
+           "--server.enableXsrfProtection", "false", "--browser.gatherUsageStats", "false"]
+    server = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit("El servidor de Streamlit no arrancó a tiempo")
+
+
+def server_stats(pid):
+    # RSS actual y pico (MB) y CPU acumulada (s) del proceso del servidor, desde /proc
+    with open(f"/proc/{pid}/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    return {"rss_mb": int(status["VmRSS"].split()[0]) / 1024, "peak_rss_mb": int(status["VmHWM"].split()[0]) / 1024,
+            "cpu_s": (int(fields[11]) + int(fields[12])) / ticks}
+
+
+class Client:
+    """Una pestaña del navegador: websocket propio, estado de widgets y latencia por rerun."""
+
+    def __init__(self, ws, rec):
+        self.ws = ws
+        self.rec = rec
+        self.pages = {} # Clave de PAGES -> page_script_hash
+        self.page = None
+        self.states = {} # id de widget -> WidgetState (el navegador reenvía todos en cada rerun)
+        self.widgets = [] # (tipo, proto) de los widgets del último rerun, en orden
+        self.elements = set()
+
+    async def rerun(self, page=None, trigger=None):
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        if page is not None and page != self.page:
+            self.page, self.states = page, {} # Navegar: los widgets de la otra página no viajan
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = self.pages.get(self.page, "")
+        states = dict(self.states)
+        if trigger is not None:
+            states[trigger.id] = trigger
+        msg.rerun_script.widget_states.widgets.extend(states.values())
+
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        self.widgets, self.elements = [], set()
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "navigation":
+                keys = list(PAGES) # Mismo orden que los archivos 1_..4_
+                self.pages = {keys[i]: p.page_script_hash for i, p in enumerate(fwd.navigation.app_pages)}
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                etype = element.WhichOneof("type")
+                self.elements.add(etype)
+                if etype in ("button", "multiselect", "selectbox", "radio"):
+                    self.widgets.append((etype, getattr(element, etype)))
+                if etype == "exception":
+                    self.rec.errors += 1
+            elif kind == "script_finished":
+                break
+        if self.page is not None:
+            self.rec.samples.setdefault(self.page, []).append(time.perf_counter() - start)
+
+    def widget(self, etype, index=0, label=None):
+        found = [w for t, w in self.widgets if t == etype and (label is None or label in w.label)]
+        return found[index]
+
+    def set_state(self, widget, **value):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        state = WidgetState(id=widget.id)
+        for name, v in value.items():
+            field = getattr(state, name)
+            field.data.extend(v) if name.endswith("array_value") else setattr(state, name, v)
+        self.states[widget.id] = state
+
+    def click(self, widget):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return WidgetState(id=widget.id, trigger_value=True)
+
+
+async def client_inicio(client, rounds):
+    for _ in range(rounds):
+        await client.rerun()
+
+
+async def client_tabla(client, rounds):
+    multiselect = client.widget("multiselect")
+    groups = list(multiselect.options)
+    for i in range(rounds):
+        client.set_state(multiselect, string_array_value=[g for g in groups if g != groups[i % len(groups)]])
+        await client.rerun()
+        client.set_state(multiselect, string_array_value=groups)
+        await client.rerun()
+
+
+async def client_wait_simulation(client, poll=0.3, timeout=60):
+    # Como el fragmento de vista previa: reruns periódicos mientras se ve la barra de progreso
+    deadline = time.monotonic() + timeout
+    while "progress" in client.elements and time.monotonic() < deadline:
+        await asyncio.sleep(poll)
+        await client.rerun()
+
+
+async def client_lab(client, rounds):
+    await client_wait_simulation(client)
+    for i in range(rounds):
+        selectbox = client.widget("selectbox")
+        client.set_state(selectbox, string_value=selectbox.options[(i + 1) % len(selectbox.options)])
+        await client.rerun()
+        await client_wait_simulation(client)
+        await client.rerun(trigger=client.click(client.widget("button", label="Reiniciar")))
+        await client_wait_simulation(client)
+
+
+async def client_genesis(client, rounds):
+    radio = client.widget("radio")
+    for i in range(rounds):
+        client.set_state(radio, string_value=radio.options[(i + 1) % len(radio.options)])
+        await client.rerun()
+
+
+CLIENT_SCRIPTS = {
+    "inicio": client_inicio,
+    "tabla": client_tabla,
+    "lab": client_lab,
+    "genesis": client_genesis,
+}
+
+
+async def run_client(url, pages, rounds):
+    import websockets
+
+    rec = Recorder()
+    async with websockets.connect(url, subprotocols=["streamlit"], max_size=None) as ws:
+        client = Client(ws, rec)
+        await client.rerun() # Sesión nueva: página principal y lista de páginas
+        for page in pages:
+            await client.rerun(page)
+            await CLIENT_SCRIPTS[page](client, rounds)
+    return rec
+
+
+def run_server_level(sessions, pages, rounds, timeout):
+    """Un servidor real nuevo por nivel, calentado con un cliente, y `sessions` clientes a la vez."""
+    port = free_port()
+    server = start_server(port)
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        asyncio.run(asyncio.wait_for(run_client(url, pages, 1), timeout)) # Imports y cachés
+        before = server_stats(server.pid)
+        wall_start = time.perf_counter()
+
+        async def level():
+            return await asyncio.gather(*(asyncio.wait_for(run_client(url, pages, rounds), timeout * rounds * 10)
+                                          for _ in range(sessions)))
+        recs = asyncio.run(level())
+        wall = time.perf_counter() - wall_start
+        after = server_stats(server.pid)
+    finally:
+        server.terminate()
+        server.wait(10)
+
+    per_page = {}
+    for rec in recs:
+        for page, values in rec.samples.items():
+            per_page.setdefault(page, []).extend(values)
+    all_samples = [t for values in per_page.values() for t in values]
+    cpu = after["cpu_s"] - before["cpu_s"]
+    return {
+        "sessions": sessions,
+        **summarize(all_samples),
+        "per_page": {page: summarize(values) for page, values in per_page.items()},
+        "errors": sum(rec.errors for rec in recs),
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "cpu_util": cpu / wall if wall else 0.0,
+        "baseline_rss_mb": before["rss_mb"],
+        "peak_rss_mb_per_session": max(0.0, after["peak_rss_mb"] - before["rss_mb"]) / sessions,
+        "peak_rss_mb_total": after["peak_rss_mb"], # Medido: RSS pico del proceso del servidor
+    }
+
+
+def print_report(results, header=True):
+    line = f"{'sesiones':>8} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'CPU s':>7} {'CPU %':>6} {'MB/ses':>7} {'MB tot':>7} {'errores':>7}"
+    if header:
+        print(line)
+        print("-" * len(line))
+    for r in results:
+        print(f"{r['sessions']:>8} {r['reruns']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['cpu_s']:>7.1f} {r['cpu_util'] * 100:>6.0f} {r['peak_rss_mb_per_session']:>7.1f} "
+              f"{r['peak_rss_mb_total']:>7.0f} {r['errors']:>7}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga multi-sesión de las páginas Streamlit.")
+    parser.add_argument("--mode", choices=["server", "isolated"], default="server",
+                        help="server: streamlit run real + clientes websocket; isolated: AppTest, un proceso por sesión")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 16], help="Niveles de sesiones concurrentes")
+    parser.add_argument("--rounds", type=int, default=3, help="Rondas de interacción por página y sesión")
+    parser.add_argument("--pages", nargs="+", choices=sorted(PAGES), default=list(PAGES), help="Páginas a recorrer")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por rerun (s)")
+    parser.add_argument("--json", help="Guardar los resultados completos en este archivo")
+    args = parser.parse_args(argv)
+
+    level = run_server_level if args.mode == "server" else run_level
+    if args.mode == "server":
+        print("Capacidad del servidor: un `streamlit run` real por nivel, clientes websocket concurrentes\n")
+    else:
+        print("Costo por sesión AISLADA (AppTest, un proceso por sesión): sin contención entre sesiones\n")
+    results = []
+    for sessions in args.sessions:
+        results.append(level(sessions, args.pages, args.rounds, args.timeout))
+        print_report(results[-1:], header=len(results) == 1) # Progreso nivel a nivel
+    if args.mode == "server":
+        print(f"\nCPU y MB: proceso del servidor (base {results[0]['baseline_rss_mb']:.0f} MB tras calentar); "
+              "MB tot: RSS pico medido; MB/ses: (pico - base) / sesiones.")
+    else:
+        print(f"\nMB/ses: RSS pico por sesión sobre un proceso base de {results[0]['baseline_rss_mb']:.0f} MB; "
+              "MB tot: extrapolación (base + suma de sesiones), no una medida de servidor.")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# Kernel de Referencia Congelado
+# Copia literal del bucle par a par original de PhysicsWorld.step (antes de las tablas de
+# interacción, el motor vectorizado y los bloques por hilos). NO se optimiza ni se toca:
+# es el oráculo contra el que tools/kernel_equivalence.py compara cada motor nuevo.
+#
+# Solo cubre la física original: blandos/duros binarios y sin reglas por par
+# (PhysicsWorld.set_pair_rule) ni blandura intermedia.
+
+import math
+
+
+def reference_forces(world):
+    """Fuerzas {id: [fx, fy]} sobre cada partícula de `world` en su estado actual."""
+    forces = {p.id: [0.0, 0.0] for p in world.particles}
+
+    for i, p1 in enumerate(world.particles):
+        for j, p2 in enumerate(world.particles):
+            if i >= j: continue # Evitar doble conteo y auto-interacción
+
+            dx = p2.x - p1.x
+            dy = p2.y - p1.y
+            dist_sq = dx*dx + dy*dy
+            dist = math.sqrt(dist_sq)
+
+            if dist < 0.1: dist = 0.1 # Evitar división por cero
+
+            ux = dx / dist
+            uy = dy / dist
+
+            fx, fy = 0.0, 0.0
+
+            # A. Fuerza de Coulomb (q1 * q2 / r^2)
+            # Cargas opuestas se atraen (-), iguales se repelen (+)
+            f_coulomb = -(world.k_coulomb * p1.charge * p2.charge) / dist_sq
+
+            # B. Repulsión de Corto Alcance (Pauli) ~ 1/r^12 simplificado a 1/r^6 para simulación visual
+            # Solo actúa si están muy cerca (tocándose)
+            contact_dist = (p1.radius + p2.radius) * 0.8 # Un poco de solape permitido
+            if dist < contact_dist:
+                f_repulsion = world.k_repulsion / (dist**4)
+                fx += f_repulsion * -ux # Empuja lejos
+                fy += f_repulsion * -uy
+
+            # C. Atracción Específica "HSAB" (Simulación de covalencia/polarización)
+            # Si ambos son BLANDOS y de carga OPUESTA, atracción extra (enlaces covalentes fuertes)
+            if not p1.is_hard and not p2.is_hard and (p1.charge * p2.charge < 0):
+                # Potencial tipo Lennard-Jones atractivo simplificado
+                if dist > contact_dist and dist < contact_dist * 3:
+                     f_soft = world.k_attraction_soft / (dist**2)
+                     fx += f_soft * ux
+                     fy += f_soft * uy
+
+            # Sumar Coulomb
+            fx += f_coulomb * ux
+            fy += f_coulomb * uy
+
+            # Aplicar fuerzas (Acción/Reacción)
+            forces[p1.id][0] += -fx
+            forces[p1.id][1] += -fy
+            forces[p2.id][0] += fx
+            forces[p2.id][1] += fy
+
+    return forces
+
+
+def reference_step(world, dt):
+    """Un paso del motor original sobre las partículas de `world` (las modifica en sitio)."""
+    # 1. Calcular Fuerzas
+    forces = reference_forces(world)
+
+    # 2. Integrar Movimiento (Euler con Amortiguación)
+    for p in world.particles:
+        fx, fy = forces[p.id]
+        ax = fx / p.mass
+        ay = fy / p.mass
+
+        p.vx = (p.vx + ax * dt) * world.damping
+        p.vy = (p.vy + ay * dt) * world.damping
+
+        # Paredes (Rebote simple)
+        if p.x < 0: p.x = 0; p.vx *= -1
+        if p.x > world.width: p.x = world.width; p.vx *= -1
+        if p.y < 0: p.y = 0; p.vy *= -1
+        if p.y > world.height: p.y = world.height; p.vy *= -1
+
+        p.update(dt)